@@ -4,26 +4,148 @@
 @project: dash dashboard
 """
 
+import threading
+import time
+from collections import namedtuple
+
 import dash_core_components as dcc
 import dash_html_components as html
-from dash.dependencies import Input, Output
+from dash.dependencies import ClientsideFunction, Input, Output, State
 import dash_bootstrap_components as dbc
-import dash_auth
 import dash
+from dash.exceptions import PreventUpdate
+
+from utility import parse_summary
+import datastore
+import catalog
+import compression
+import figure_cache
+import jobs
+import layout_cache
+import metrics
+import session_auth
+import single_flight
+import snapshot
+import upload_cache
+from app_users import USERNAME_PASSWORD_HASHES
+
+# responses are compressed by compression.py instead, brotli | gzip
+app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP], compress=False)
+auth = session_auth.BasicAuth(app, USERNAME_PASSWORD_HASHES)
+server = app.server
+metrics.init_app(app, auth)
+compression.init_app(app)
+
+# every file under DATA_DIR, indexed now and parsed when first selected
+catalog.scan()
+
+# datasets shown by this worker, loaded lazily from the shared dataset store:
+# one immutable view of every frame + derived table, never modified, only
+# replaced as a whole (a single reference swap) when a new version comes in.
+# each callback pins one view for its whole run, so threaded workers
+# (gunicorn --threads) never see an upload half applied, with no lock to read
+DatasetView = namedtuple(
+    "DatasetView",
+    [
+        "ecoVersion",
+        "dfEco",
+        # value | change since previous year of every indicator, per year
+        "ecoSummary",
+        "aitVersion",
+        "dfAit",
+    ],
+)
 
-from utility import parse_data, parse_summary
-from app_users import USERNAME_PASSWORD_PAIRS
+NO_DATASETS = DatasetView(None, None, None, None, None)
+
+datasets = NO_DATASETS
+_datasetsLock = threading.Lock()
+
+# bundled datasets checked against the store by this worker, see loadDataset
+_seeded = set()
+
+
+def loadBundled(name):
+    start = time.perf_counter()
+    df = snapshot.load(snapshot.BUNDLED[name])
+    metrics.observe_parse(name, time.perf_counter() - start)
+
+    return df
+
+
+def loadDataset(name):
+    """
+    latest version of a dataset, the first worker to need a bundled dataset
+    publishes it from its snapshot (see snapshot.py), published again once
+    after a restart when the bundled file changed
+    """
+
+    if name not in _seeded:
+        snapshot.seed(name, lambda: loadBundled(name))
+        _seeded.add(name)
+
+    return datastore.load(name)
+
+
+def selectedDataset(name, datasetId, view):
+    """
+    (dataset id, version, dataframe) picked in a dataset selector, `eco` | `ait`
+    is the shared one (bundled | uploaded) of the pinned view, any other id a
+    catalog file, the shared one again when that file is unknown | unreadable
+    """
+
+    if datasetId not in (None, name):
+        try:
+            return (datasetId, *catalog.load(datasetId))
+
+        except (OSError, ValueError) as e:
+            # a stale page, or a file removed | broken since the last scan
+            print(f"[ERROR] Error loading dataset: `{datasetId}`. {e}")
+
+    if name == "eco":
+        return name, view.ecoVersion, view.dfEco
+
+    return name, view.aitVersion, view.dfAit
 
-app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
-auth = dash_auth.BasicAuth(app, USERNAME_PASSWORD_PAIRS)
-server = app.server
 
-# load static data
-# annual international trade stats
-dfAit = parse_data(filename="data/ait.csv", isFileOnly=True, transpose=True)
+def currentDatasets():
+    """
+    the latest DatasetView, rebuilt when any worker published a new version
+    since the last callback, pin it once per callback
+    """
+
+    global datasets
+
+    view = datasets
+    if view is not NO_DATASETS and (view.ecoVersion, view.aitVersion) == (
+        datastore.current_version("eco"),
+        datastore.current_version("ait"),
+    ):
+        return view
+
+    # one thread builds the new view, the others keep reading theirs
+    with _datasetsLock:
+        view = datasets
+        aitVersion, dfAit = loadDataset("ait")
+        ecoVersion, dfEco = loadDataset("eco")
+
+        if (view.ecoVersion, view.aitVersion) == (ecoVersion, aitVersion):
+            return view
+
+        if ecoVersion == view.ecoVersion:
+            ecoSummary = view.ecoSummary
+
+        else:
+            ecoSummary = upload_cache.summary(dfEco)
+            metrics.observe_dataset("eco", ecoVersion, dfEco)
+
+        if aitVersion != view.aitVersion:
+            metrics.observe_dataset("ait", aitVersion, dfAit)
+
+        datasets = DatasetView(ecoVersion, dfEco, ecoSummary, aitVersion, dfAit)
+
+        return datasets
 
-# economic indicators
-dfEco = parse_data(filename="data/eco-ind.csv", isFileOnly=True)
 
 uploadAit = dcc.Upload(
     id="upload-ait-data",
@@ -47,6 +169,16 @@ jumbtronHeader = dbc.Jumbotron(
         ),
         dbc.Row(
             [
+                # merge uploads into the current data instead of replacing it,
+                # see jobs.py
+                dbc.Checklist(
+                    id="upload-mode",
+                    options=[{"label": "Append to current data", "value": "append"}],
+                    value=[],
+                    switch=True,
+                    inline=True,
+                    className="mr-2 align-self-center",
+                ),
                 dbc.Button(
                     uploadAit,
                     size="md",
@@ -60,18 +192,39 @@ jumbtronHeader = dbc.Jumbotron(
             ],
             justify="end",
         ),
+        # upload job status, see update_*_job
+        dbc.Row(
+            [
+                html.Small(id="ait-upload-status", className="mr-3"),
+                html.Small(id="ei-upload-status", className="mr-1"),
+            ],
+            justify="end",
+        ),
     ],
 )
 
 
+def datasetSelector(selectorID, name):
+    """
+    dropdown of the shared dataset + every catalog file of the same kind
+    """
+
+    return dcc.Dropdown(
+        id=selectorID,
+        value=name,
+        options=[{"value": name, "label": "Latest upload"}] + catalog.options(name),
+        clearable=False,
+        placeholder="Select Dataset",
+    )
+
+
 def summaryYearItems(yearList):
     items = []
-    yearList.remove("Year")
 
     for year in yearList:
         items.append(
             {
-                "value": f"{year}",
+                "value": year,
                 "label": f"{year}",
             }
         )
@@ -163,79 +316,97 @@ def getSecondRowSummaryCards():
     return cards
 
 
-summaryCard = html.Div(
-    [
-        dbc.Card(
-            [
-                dbc.CardHeader(
-                    [
-                        dbc.Row(
-                            [
-                                dbc.Col(
-                                    html.Div(
-                                        "Summary for Year:",
-                                        className="card-text",
+def getSummaryCard(yearList):
+    """
+    summary card, the year dropdown lists the economic indicators' years
+    """
+
+    firstRow = getFirstRowSummaryCards()
+    secondRow = getSecondRowSummaryCards()
+
+    return html.Div(
+        [
+            dbc.Card(
+                [
+                    dbc.CardHeader(
+                        [
+                            dbc.Row(
+                                [
+                                    dbc.Col(
+                                        html.Div(
+                                            "Summary for Year:",
+                                            className="card-text",
+                                        ),
+                                        width=4,
                                     ),
-                                    width=4,
-                                ),
-                                dbc.Col(html.Div(id="summary-year-value"), width=4),
-                            ],
-                            justify="start",
-                        ),
-                        dbc.Col(
-                            dcc.Dropdown(
-                                id="summary-year-filter",
-                                value=list(dfEco.columns.values)[-1],
-                                options=summaryYearItems(list(dfEco.columns.values)),
-                                clearable=False,
-                                placeholder="Select Year",
+                                    dbc.Col(html.Div(id="summary-year-value"), width=4),
+                                ],
+                                justify="start",
                             ),
-                            width={"size": 4},
-                        ),
-                    ],
-                ),
-                dbc.CardBody(
-                    [
-                        dbc.Row(
-                            [
-                                dbc.Col(
-                                    getFirstRowSummaryCards()[0],
-                                ),
-                                dbc.Col(
-                                    getFirstRowSummaryCards()[1],
-                                ),
-                                dbc.Col(
-                                    getFirstRowSummaryCards()[2],
-                                ),
-                                dbc.Col(
-                                    getFirstRowSummaryCards()[3],
-                                ),
-                            ],
-                            className="mb-4",
-                        ),
-                        dbc.Row(
-                            [
-                                dbc.Col(
-                                    getSecondRowSummaryCards()[0],
-                                ),
-                                dbc.Col(
-                                    getSecondRowSummaryCards()[1],
-                                ),
-                                dbc.Col(
-                                    getSecondRowSummaryCards()[2],
-                                ),
-                                dbc.Col(
-                                    getSecondRowSummaryCards()[3],
-                                ),
-                            ],
-                            className="mb-4",
-                        ),
-                    ],
-                ),
-            ],
-        ),
-    ],
-)
+                            dbc.Row(
+                                [
+                                    dbc.Col(
+                                        dcc.Dropdown(
+                                            id="summary-year-filter",
+                                            value=yearList[-1] if yearList else None,
+                                            options=summaryYearItems(yearList),
+                                            clearable=False,
+                                            placeholder="Select Year",
+                                        ),
+                                        width={"size": 4},
+                                    ),
+                                    dbc.Col(
+                                        datasetSelector("eco-dataset", "eco"),
+                                        width={"size": 4},
+                                    ),
+                                ],
+                                justify="between",
+                            ),
+                        ],
+                    ),
+                    dbc.CardBody(
+                        [
+                            dbc.Row(
+                                [
+                                    dbc.Col(
+                                        firstRow[0],
+                                    ),
+                                    dbc.Col(
+                                        firstRow[1],
+                                    ),
+                                    dbc.Col(
+                                        firstRow[2],
+                                    ),
+                                    dbc.Col(
+                                        firstRow[3],
+                                    ),
+                                ],
+                                className="mb-4",
+                            ),
+                            dbc.Row(
+                                [
+                                    dbc.Col(
+                                        secondRow[0],
+                                    ),
+                                    dbc.Col(
+                                        secondRow[1],
+                                    ),
+                                    dbc.Col(
+                                        secondRow[2],
+                                    ),
+                                    dbc.Col(
+                                        secondRow[3],
+                                    ),
+                                ],
+                                className="mb-4",
+                            ),
+                        ],
+                    ),
+                ],
+            ),
+        ],
+    )
+
 
 mainGraph = html.Div(
     [
@@ -306,35 +477,18 @@ mainGraph = html.Div(
                                                 "size": 4,
                                             },
                                         ),
+                                        dbc.Col(
+                                            datasetSelector("ait-dataset", "ait"),
+                                            width={
+                                                "size": 4,
+                                            },
+                                        ),
                                     ],
                                     justify="between",
                                 ),
-                                dcc.Graph(
-                                    id="btei-graph",
-                                    figure={
-                                        "data": [
-                                            {
-                                                "x": dfAit[6],
-                                                "y": dfAit[7],
-                                                "type": "bar",
-                                                "name": "Imports",
-                                            },
-                                            {
-                                                "x": dfAit[6],
-                                                "y": dfAit[8],
-                                                "type": "bar",
-                                                "name": "Exports",
-                                            },
-                                            {
-                                                "x": dfAit[6],
-                                                "y": dfAit[9],
-                                                "name": "Trade Surplus",
-                                                "type": "lines",  # toggle between 'lines' and 'bar'
-                                                "color": "grey",
-                                            },
-                                        ]
-                                    },
-                                ),
+                                # figure is drawn in the browser from btei-data,
+                                # see assets/chart.js
+                                dcc.Graph(id="btei-graph"),
                             ],
                         ),
                     ),
@@ -344,59 +498,227 @@ mainGraph = html.Div(
     ]
 )
 
-app.layout = html.Div(
-    children=[
+
+def uploadJobComponents():
+    """
+    upload job id stores + the intervals polling them, enabled while a job runs
+    """
+
+    components = []
+
+    for name in ("ei", "ait"):
+        components.append(dcc.Store(id=f"{name}-upload-job"))
+        components.append(
+            dcc.Interval(id=f"{name}-upload-poll", interval=500, disabled=True)
+        )
+
+    return components
+
+
+# layout tree per (eco, ait) version, built on the first page load
+_layout = {}
+
+
+def serve_layout():
+    """
+    page layout, built from the datasets current on the first request instead of
+    at import, and rebuilt only when an upload published a new version
+    """
+
+    global _layout
+
+    view = currentDatasets()
+
+    key = (view.ecoVersion, view.aitVersion)
+    layout = _layout.get(key)
+
+    if layout is None:
+        layout = html.Div(
+            children=[
+                jumbtronHeader,
+                html.Div(
+                    [
+                        getSummaryCard(view.dfEco.columns.tolist()),
+                    ],
+                    id="eco-graph-data",
+                ),
+                html.Div(
+                    [mainGraph],
+                    id="ait-graph-data",
+                ),
+                # economic indicators version shown, bumped by uploads
+                dcc.Store(id="eco-version", data=view.ecoVersion),
+                # both industries' series, so switching charts needs no server call
+                dcc.Store(
+                    id="btei-data",
+                    data=figure_cache.trade_series_json(
+                        "ait", view.aitVersion, view.dfAit
+                    ),
+                ),
+            ]
+            + uploadJobComponents(),
+        )
+
+        # swapped whole, requests in other threads read the dict meanwhile
+        _layout = {key: layout}
+
+    return layout
+
+
+# same component ids without any data, so dash validates callbacks against it
+# instead of calling serve_layout (and loading the datasets) at import
+app.validation_layout = html.Div(
+    [
         jumbtronHeader,
-        html.Div(
-            [
-                summaryCard,
-            ],
-            id="eco-graph-data",
-        ),
-        html.Div(
-            [mainGraph],
-            id="ait-graph-data",
-        ),
-    ],
+        getSummaryCard([]),
+        mainGraph,
+        dcc.Store(id="eco-version"),
+        dcc.Store(id="btei-data"),
+    ]
+    + uploadJobComponents()
 )
+app.layout = serve_layout
+
+
+def layoutVersion():
+    view = currentDatasets()
+    return view.ecoVersion, view.aitVersion
+
+
+# `/_dash-layout` json | gzip | brotli encoded once per version, with an ETag
+layout_cache.init_app(app, layoutVersion, auth)
+
 
 # callback definition
+# uploads are parsed by a background job (see jobs.py), the page polls it and
+# only data props (store | dropdown options) are updated once it is done,
+# the static layout is never sent back
 @app.callback(
-    Output("eco-graph-data", "children"),
+    Output("ei-upload-job", "data"),
     [
         Input("upload-ei-data", "contents"),
         Input("upload-ei-data", "filename"),
     ],
+    State("upload-mode", "value"),
+    prevent_initial_call=True,
 )
-def update_ei_based_layout(contents, filename):
-    global dfEco
-
-    if contents and filename:
-        dfEco = parse_data(filename, contents)
+def update_ei_based_layout(contents, filename, upload_mode):
+    if not (contents and filename):
+        raise PreventUpdate
 
-    eiLayout = summaryCard
-
-    return eiLayout
+    return jobs.submit("eco", filename, contents, "append" in (upload_mode or []))
 
 
 @app.callback(
-    Output("ait-graph-data", "children"),
+    Output("ait-upload-job", "data"),
     [
         Input("upload-ait-data", "contents"),
         Input("upload-ait-data", "filename"),
     ],
+    State("upload-mode", "value"),
+    prevent_initial_call=True,
 )
-def update_ait_based_layout(contents, filename):
-    global dfAit
+def update_ait_based_layout(contents, filename, upload_mode):
+    if not (contents and filename):
+        raise PreventUpdate
+
+    return jobs.submit("ait", filename, contents, "append" in (upload_mode or []))
+
+
+def uploadJobStatus(name, jobId):
+    """
+    job status + whether to keep polling, a done job's parse time goes to /metrics
+    """
 
-    if contents and filename:
-        dfAit = parse_data(filename, contents)
+    if not jobId:
+        raise PreventUpdate
 
-    aitLayout = mainGraph
+    status = jobs.status(jobId)
+    state = status["state"]
+    filename = status.get("filename", "")
 
-    return aitLayout
+    if state == "done":
+        metrics.observe_parse(name, status["seconds"])
+        return status, f"`{filename}` loaded", True
+
+    if state == "failed":
+        return status, f"Error processing `{filename}`: {status['error']}", True
+
+    if state == "unknown":
+        return status, "Upload status lost, please upload again", True
+
+    return status, f"Processing `{filename}` ...", False
 
 
+@app.callback(
+    Output("eco-version", "data"),
+    Output("summary-year-filter", "options"),
+    Output("summary-year-filter", "value"),
+    Output("ei-upload-status", "children"),
+    Output("ei-upload-poll", "disabled"),
+    Input("ei-upload-poll", "n_intervals"),
+    Input("ei-upload-job", "data"),
+    Input("eco-dataset", "value"),
+    State("summary-year-filter", "value"),
+    prevent_initial_call=True,
+)
+def update_ei_upload_job(n_intervals, job_id, eco_dataset, summary_year):
+    view = currentDatasets()
+    triggered = [trigger["prop_id"] for trigger in dash.callback_context.triggered]
+
+    if "eco-dataset.value" in triggered:
+        # another dataset picked, only the years change
+        version, message, finished = dash.no_update, dash.no_update, dash.no_update
+
+    else:
+        status, message, finished = uploadJobStatus("eco", job_id)
+
+        if status["state"] != "done":
+            return dash.no_update, dash.no_update, dash.no_update, message, finished
+
+        version = view.ecoVersion
+
+    years = selectedDataset("eco", eco_dataset, view)[2].columns.tolist()
+
+    if summary_year not in years:
+        summary_year = years[-1]
+
+    return version, summaryYearItems(years), summary_year, message, finished
+
+
+@app.callback(
+    Output("btei-data", "data"),
+    Output("ait-upload-status", "children"),
+    Output("ait-upload-poll", "disabled"),
+    Input("ait-upload-poll", "n_intervals"),
+    Input("ait-upload-job", "data"),
+    Input("ait-dataset", "value"),
+    prevent_initial_call=True,
+)
+def update_ait_upload_job(n_intervals, job_id, ait_dataset):
+    view = currentDatasets()
+    triggered = [trigger["prop_id"] for trigger in dash.callback_context.triggered]
+
+    if "ait-dataset.value" in triggered:
+        message, finished = dash.no_update, dash.no_update
+
+    else:
+        status, message, finished = uploadJobStatus("ait", job_id)
+
+        if status["state"] != "done":
+            return dash.no_update, message, finished
+
+    datasetId, version, df = selectedDataset("ait", ait_dataset, view)
+
+    return (
+        figure_cache.trade_series_json(datasetId, version, df),
+        message,
+        finished,
+    )
+
+
+# the room-wide callback: identical concurrent requests share one response
+@single_flight.coalesce(app, currentDatasets, lambda view: view.ecoVersion)
 @app.callback(
     Output("summary-year-value", "children"),
     Output("budget-deficit", "children"),
@@ -416,83 +738,33 @@ def update_ait_based_layout(contents, filename):
     Output("private-inv", "children"),
     Output("pigdp-imports-perc-change", "children"),
     Input("summary-year-filter", "value"),
+    Input("eco-version", "data"),
+    Input("eco-dataset", "value"),
 )
-def update_summary_year_div(summary_year):
-    return parse_summary(html, list(dfEco.columns.values), summary_year, dfEco)
+def update_summary_year_div(summary_year, eco_version, eco_dataset, view):
+    datasetId, version, df = selectedDataset("eco", eco_dataset, view)
 
+    if datasetId == "eco":
+        summary = view.ecoSummary
 
-@app.callback(
+    else:
+        summary = upload_cache.summary(df)
+
+    return parse_summary(html, summary_year, summary)
+
+
+# return btn color change + chart type + indicated data-source, in the browser
+app.clientside_callback(
+    ClientsideFunction(namespace="chart", function_name="update_main_chart_btn_color"),
     Output("primary-opt", "color"),
     Output("secondary-opt", "color"),
     Output("btei-graph", "figure"),
     Input("primary-opt", "n_clicks"),
     Input("secondary-opt", "n_clicks"),
     Input("chart-type-filter", "value"),
+    Input("btei-data", "data"),
+    State("primary-opt", "color"),
 )
-def update_main_chart_btn_color(primary_btn, secondary_btn, chart_type):
-    # return btn color change + chart type + indicated data-source
-    changed_id = [p["prop_id"] for p in dash.callback_context.triggered][0]
-
-    pri = "primary"
-    sec = "secondary"
-    barChart = "bar"
-    assumedLineChart = "lines"
-
-    if chart_type == "bar":
-        assumedLineChart = "bar"
-
-    elif chart_type == "line":
-        barChart = "lines"
-
-    if "primary-opt" in changed_id:
-        pri = "primary"
-        sec = "secondary"
-
-    elif "secondary-opt" in changed_id:
-        pri = "secondary"
-        sec = "primary"
-
-    if pri == "secondary":
-        figureUpdate = {
-            "data": [
-                {"x": dfAit[0], "y": dfAit[1], "type": barChart, "name": "Imports"},
-                {"x": dfAit[0], "y": dfAit[2], "type": barChart, "name": "Exports"},
-                {
-                    "x": dfAit[0],
-                    "y": dfAit[3],
-                    "name": "Trade Deficit",
-                    "type": assumedLineChart,  # toggle between 'lines' and 'bar'
-                    "color": "grey",
-                },
-            ]
-        }
-
-    else:
-        figureUpdate = {
-            "data": [
-                {
-                    "x": dfAit[6],
-                    "y": dfAit[7],
-                    "type": barChart,
-                    "name": "Imports",
-                },
-                {
-                    "x": dfAit[6],
-                    "y": dfAit[8],
-                    "type": barChart,
-                    "name": "Exports",
-                },
-                {
-                    "x": dfAit[6],
-                    "y": dfAit[9],
-                    "name": "Trade Surplus",
-                    "type": assumedLineChart,  # toggle between 'lines' and 'bar'
-                    "color": "grey",
-                },
-            ]
-        }
-
-    return pri, sec, figureUpdate
 
 if __name__ == "__main__":
     app.run_server(debug=False, dev_tools_ui=False, dev_tools_props_check=False)
@@ -1,8 +1,17 @@
 # basic app auth
 
-# user dictionary
-USERNAME_PASSWORD_PAIRS = {
-     'user1': 'test1',
-     'user2': 'test2',
-     'user3': 'test3'
-}
\ No newline at end of file
+# user dictionary: salted password hashes, add one with `python app_users.py <username>`
+USERNAME_PASSWORD_HASHES = {
+    "user1": "pbkdf2:sha256:150000$jlXvgc89$7a625958fcc233f016e1bdc2601d0e7f6b8242a3324251650d618dbcea047e27",
+    "user2": "pbkdf2:sha256:150000$Wdf7R1TP$7534e799108fb52e8f9e4acab03f8f9d2281cc9f7793b3e1fdfd092740737b7e",
+    "user3": "pbkdf2:sha256:150000$RkD7um3k$f4869530c500e7cb347aa546d25e3c15680a5fc964837d60381d9435c194dcdf",
+}
+
+if __name__ == "__main__":
+    import getpass
+    import sys
+
+    from werkzeug.security import generate_password_hash
+
+    # salted PBKDF2-SHA256, checked once per session by session_auth.py
+    print(f'    "{sys.argv[1]}": "{generate_password_hash(getpass.getpass())}",')
@@ -0,0 +1,55 @@
+/*
+ * clientside callbacks, served by dash from the assets folder
+ */
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    chart: {
+        /*
+         * btn color change + chart type + indicated data-source
+         * trade: both industries' series from the btei-data store (figure_cache.trade_series_json)
+         * primaryColor: current primary-opt color, "secondary" when secondary is shown
+         */
+        update_main_chart_btn_color: function (primaryBtn, secondaryBtn, chartType, trade, primaryColor) {
+            var changedIds = dash_clientside.callback_context.triggered.map(function (p) {
+                return p.prop_id;
+            });
+
+            var industry = primaryColor === "secondary" ? "secondary" : "primary";
+            var barChart = "bar";
+            var assumedLineChart = "lines";
+
+            if (chartType === "bar") {
+                assumedLineChart = "bar";
+            } else if (chartType === "line") {
+                barChart = "lines";
+            }
+
+            if (changedIds.indexOf("primary-opt.n_clicks") !== -1) {
+                industry = "primary";
+            } else if (changedIds.indexOf("secondary-opt.n_clicks") !== -1) {
+                industry = "secondary";
+            }
+
+            // each industry is a json string serialized once on the server (figure_cache)
+            var series = JSON.parse(trade[industry]);
+            var data = series.traces.map(function (trace, i) {
+                var isBalance = i === series.traces.length - 1;
+
+                return {
+                    x: series.x,
+                    y: trace.y,
+                    name: trace.name,
+                    // toggle between 'lines' and 'bar'
+                    type: isBalance ? assumedLineChart : barChart,
+                    color: isBalance ? "grey" : undefined
+                };
+            });
+
+            if (industry === "secondary") {
+                return ["secondary", "primary", {data: data}];
+            }
+
+            return ["primary", "secondary", {data: data}];
+        }
+    }
+});
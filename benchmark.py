@@ -0,0 +1,525 @@
+"""
+benchmark suite
+
+times number parsing, the free text helpers, ingest (parse_data), the summary and the update_*
+callbacks (called directly, no http) on synthetic economic indicator and trade
+stats sheets generated with Faker, scaled from the bundled sizes
+(30 years x 17 indicators) up to 10,000 years | 5,000 indicators.
+
+    python benchmark.py                           # default sizes -> benchmark.json
+    python benchmark.py --quick -o quick.json     # smallest sizes only
+    python benchmark.py --full                    # up to 10,000 years x 5,000 rows
+    python benchmark.py --compare baseline.json   # flag regressions, exit 1 if any
+    python benchmark.py --compare baseline.json --results benchmark.json
+
+results are the median | min | mean seconds per case. a case is a regression
+when its median is slower than the baseline's by more than --tolerance
+(and by more than a millisecond, below that it's noise).
+"""
+
+import argparse
+import base64
+import csv
+import datetime
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+from faker import Faker
+
+# (years, indicator rows) of every dataset benchmarked
+QUICK_SIZES = [(30, 17), (300, 170)]
+DEFAULT_SIZES = QUICK_SIZES + [(1000, 1000)]
+FULL_SIZES = DEFAULT_SIZES + [(10000, 17), (30, 5000), (10000, 5000)]
+
+# strings timed per parseNumber run
+NUMBER_SAMPLES = 10000
+
+# free text notes timed per text helper run, in characters
+TEXT_SIZE = 1024 * 1024
+
+# slower | faster than the baseline by less than this is noise
+TOLERANCE = 0.2
+NOISE_SECONDS = 0.001
+
+
+def number_cell(value, style):
+    """
+    -> a value written the way the bundled sheets mix them
+    :param value: float
+    :param style: 0 plain, 1 thousands separated, 2 two decimals, 3 percentage
+    :return: str
+    """
+
+    if style == 0:
+        return f"{value:.1f}"
+
+    if style == 1:
+        return f"{round(value):,}"
+
+    if style == 2:
+        return f"{value:,.2f}"
+
+    return f"{value:.1f}%"
+
+
+def indicator_rows(fake, years, rows, firstYear=1980):
+    """
+    -> synthetic economic indicators sheet, `Year` row first (see data/eco-ind.csv)
+    :return: list of csv rows
+    """
+
+    rng = np.random.default_rng(fake.random.randint(0, 2**32))
+    sheet = [["Year"] + list(range(firstYear, firstYear + years))]
+
+    for row in range(rows):
+        label = fake.unique.catch_phrase()
+        values = rng.lognormal(8, 3, years) * rng.choice([-1, 1], years, p=[0.1, 0.9])
+        style = fake.random.randint(0, 3)
+        sheet.append([label] + [number_cell(value, style) for value in values])
+
+    return sheet
+
+
+def trade_rows(fake, years, rows, firstYear=2008):
+    """
+    -> synthetic trade stats sheet, one titled block per industry (see data/ait.csv)
+    :return: list of csv rows
+    """
+
+    rng = np.random.default_rng(fake.random.randint(0, 2**32))
+    sheet = []
+
+    for industry, balance in (
+        ("Secondary", "Trade deficit"),
+        ("Primary", "Trade Surplus"),
+    ):
+        if sheet:
+            sheet.append([""] * (years + 1))
+
+        title = f"{fake.country()} {industry} Industry Balance of Trade"
+        sheet.append([title] + [""] * years)
+        sheet.append(["Year"] + list(range(firstYear, firstYear + years)))
+
+        imports = rng.uniform(1e9, 9e9, years)
+        exports = rng.uniform(1e9, 9e9, years)
+        block = [
+            ("Imports", imports),
+            ("Exports", exports),
+            (balance, exports - imports),
+        ]
+        block += [
+            (fake.unique.bs(), rng.uniform(1e6, 1e9, years))
+            for row in range(max(rows // 2 - 4, 0))
+        ]
+
+        for label, values in block:
+            sheet.append([label] + [f"{value:,.2f}" for value in values])
+
+    return sheet
+
+
+def csv_upload(sheet):
+    """
+    -> dcc.Upload contents of a sheet written as csv
+    """
+
+    text = io.StringIO()
+    csv.writer(text, lineterminator="\n").writerows(sheet)
+    payload = base64.b64encode(text.getvalue().encode()).decode()
+
+    return f"data:text/csv;base64,{payload}"
+
+
+def xlsx_upload(sheet):
+    """
+    -> dcc.Upload contents of a sheet written as xlsx, None without openpyxl
+    """
+
+    try:
+        import openpyxl
+
+    except ImportError:
+        return None
+
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+    for row in sheet:
+        worksheet.append(row)
+
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    payload = base64.b64encode(buffer.getvalue()).decode()
+
+    return (
+        "data:application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;"
+        f"base64,{payload}"
+    )
+
+
+def measure(run, setup=None, repeat=5, budget=10.0):
+    """
+    -> time a case, repeated until `repeat` runs or `budget` seconds
+    :param run: callable timed
+    :param setup: callable run (untimed) before every run
+    :return: dict median | min | mean seconds, runs
+    """
+
+    times = []
+
+    while len(times) < repeat and sum(times) < budget:
+        if setup:
+            setup()
+
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    return {
+        "median": statistics.median(times),
+        "min": min(times),
+        "mean": statistics.mean(times),
+        "runs": len(times),
+    }
+
+
+def reset_caches():
+    # parse | summarize | serialize again instead of hitting the caches
+    import figure_cache
+    import upload_cache
+
+    upload_cache._entries.clear()
+    figure_cache._figures.clear()
+    shutil.rmtree(upload_cache.CACHE_DIR, ignore_errors=True)
+
+
+def number_cases(fake, repeat, budget):
+    from parse_number import parseNumber, parseNumberArray
+
+    samples = [
+        number_cell(fake.pyfloat(min_value=-1e9, max_value=1e9), n % 4)
+        for n in range(NUMBER_SAMPLES)
+    ]
+    samples += [f"{fake.currency_symbol()} {sample}" for sample in samples[:1000]]
+
+    return {
+        f"parseNumber[{len(samples)} strings]": measure(
+            lambda: [parseNumber(sample) for sample in samples], None, repeat, budget
+        ),
+        f"parseNumberArray[{len(samples)} strings]": measure(
+            lambda: parseNumberArray(samples), None, repeat, budget
+        ),
+    }
+
+
+def notes_text(fake, size=TEXT_SIZE):
+    """
+    -> free text notes mixing words with numbers ("1 000 000", "3,5", "-2.75")
+    """
+
+    parts = []
+    length = 0
+
+    while length < size:
+        number = fake.random.choice(
+            (
+                f"{fake.random.randint(0, 10 ** 9):,}".replace(",", " "),
+                f"{fake.random.randint(0, 999)},{fake.random.randint(0, 99)}",
+                f"{fake.pyfloat(min_value=-1e6, max_value=1e6)}",
+            )
+        )
+        parts.append(f"{fake.sentence()} {number}")
+        length += len(parts[-1]) + 1
+
+    return " ".join(parts)[:size]
+
+
+def text_cases(fake, repeat, budget):
+    from parse_number import (
+        digitalizeIntegers,
+        floatAsReadable,
+        getAllNumbers,
+        iterNumbers,
+        removeAllNumbers,
+    )
+
+    text = notes_text(fake)
+    # worst case of the old fixpoint loops: one long run of spaced digits
+    spaced = ("1 " * (TEXT_SIZE // 2))[:TEXT_SIZE]
+    floats = [fake.pyfloat() * 10 ** fake.random.randint(-30, 30) for n in range(10000)]
+
+    size = f"{TEXT_SIZE // 1024} KB"
+    return {
+        f"getAllNumbers[{size} notes]": measure(
+            lambda: getAllNumbers(text), None, repeat, budget
+        ),
+        f"getAllNumbers[{size} spaced digits]": measure(
+            lambda: getAllNumbers(spaced), None, repeat, budget
+        ),
+        f"iterNumbers[{size} notes, first]": measure(
+            lambda: next(iterNumbers(text)), None, repeat, budget
+        ),
+        f"removeAllNumbers[{size} notes]": measure(
+            lambda: removeAllNumbers(text), None, repeat, budget
+        ),
+        f"removeAllNumbers[{size} spaced digits]": measure(
+            lambda: removeAllNumbers(spaced), None, repeat, budget
+        ),
+        f"digitalizeIntegers[{size} notes]": measure(
+            lambda: digitalizeIntegers(text, 20), None, repeat, budget
+        ),
+        "floatAsReadable[10000 floats]": measure(
+            lambda: [floatAsReadable(f) for f in floats], None, repeat, budget
+        ),
+    }
+
+
+def size_cases(fake, years, rows, repeat, budget):
+    import dash_html_components as html
+
+    import app
+    from utility import parse_data, parse_summary, summary_table
+
+    size = f"{years}x{rows}"
+    eco = indicator_rows(fake, years, rows)
+    ait = trade_rows(fake, years, rows)
+    uploads = {
+        "csv": (csv_upload(eco), csv_upload(ait)),
+        "xlsx": (xlsx_upload(eco), xlsx_upload(ait)),
+    }
+
+    results = {}
+    lastYear = eco[0][-1]
+
+    for fileType, (ecoContents, aitContents) in uploads.items():
+        if ecoContents is None:
+            print(f"[-] skipping {fileType} cases, openpyxl is not installed")
+            continue
+
+        filename = f"eco.{fileType}"
+        results[f"parse_data[{fileType} eco {size}]"] = measure(
+            lambda: parse_data(filename, ecoContents), None, repeat, budget
+        )
+        results[f"parse_data[{fileType} ait {size}]"] = measure(
+            lambda: parse_data(f"ait.{fileType}", aitContents), None, repeat, budget
+        )
+
+    ecoContents, aitContents = uploads["csv"]
+    df = parse_data("eco.csv", ecoContents)
+
+    results[f"summary_table[{size}]"] = measure(
+        lambda: summary_table(df), None, repeat, budget
+    )
+    summary = summary_table(df)
+    results[f"parse_summary[{size}]"] = measure(
+        lambda: parse_summary(html, lastYear, summary), None, repeat, budget
+    )
+
+    # jobs run inline (UPLOAD_WORKERS=0), so this is parse + publish
+    results[f"update_ei_based_layout[csv {size}]"] = measure(
+        lambda: app.update_ei_based_layout.__wrapped__(ecoContents, "eco.csv", []),
+        reset_caches,
+        repeat,
+        budget,
+    )
+    results[f"update_ait_based_layout[csv {size}]"] = measure(
+        lambda: app.update_ait_based_layout.__wrapped__(aitContents, "ait.csv", []),
+        reset_caches,
+        repeat,
+        budget,
+    )
+
+    # one more year of every indicator, merged into the published dataset
+    appendContents = csv_upload(
+        [["Year", lastYear + 1]]
+        + [[label, value] for label, value in zip(df.index, df[lastYear] * 1.05)]
+    )
+    results[f"update_ei_based_layout[append 1 year {size}]"] = measure(
+        lambda: app.update_ei_based_layout.__wrapped__(
+            appendContents, "append.csv", ["append"]
+        ),
+        None,
+        repeat,
+        budget,
+    )
+
+    ecoJob = app.update_ei_based_layout.__wrapped__(ecoContents, "eco.csv", [])
+    aitJob = app.update_ait_based_layout.__wrapped__(aitContents, "ait.csv", [])
+
+    def forgetDatasets():
+        reset_caches()
+        app.datasets = app.NO_DATASETS
+
+    # the job callbacks read callback_context, as within a request
+    with app.server.test_request_context():
+        results[f"update_ei_upload_job[csv {size}]"] = measure(
+            lambda: app.update_ei_upload_job.__wrapped__(1, ecoJob, "eco", lastYear),
+            forgetDatasets,
+            repeat,
+            budget,
+        )
+        results[f"update_ait_upload_job[csv {size}]"] = measure(
+            lambda: app.update_ait_upload_job.__wrapped__(1, aitJob, "ait"),
+            forgetDatasets,
+            repeat,
+            budget,
+        )
+
+    def forgetSummary():
+        reset_caches()
+        app.datasets = app.datasets._replace(ecoVersion=None)
+
+    results[f"update_summary_year_div[{size}]"] = measure(
+        lambda: app.update_summary_year_div.__wrapped__(
+            lastYear, None, "eco", view=app.currentDatasets()
+        ),
+        forgetSummary,
+        repeat,
+        budget,
+    )
+    results[f"update_summary_year_div[cached {size}]"] = measure(
+        lambda: app.update_summary_year_div.__wrapped__(
+            lastYear, None, "eco", view=app.currentDatasets()
+        ),
+        None,
+        repeat,
+        budget,
+    )
+
+    return results
+
+
+def run(sizes, repeat, budget, seed=0):
+    """
+    -> run every case on synthetic data
+    :param sizes: list of (years, indicator rows)
+    :return: dict, written as the results json
+    """
+
+    Faker.seed(seed)
+    fake = Faker()
+
+    results = number_cases(fake, repeat, budget)
+    results.update(text_cases(fake, repeat, budget))
+    for years, rows in sizes:
+        print(f"[+] {years} years x {rows} indicators")
+        results.update(size_cases(fake, years, rows, repeat, budget))
+
+    return {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "sizes": sizes,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, tolerance=TOLERANCE):
+    """
+    -> median of every case against the baseline
+    :param baseline: results json of the reference run
+    :param current: results json of this run
+    :return: list of (case, baseline s, current s, ratio, is regression)
+    """
+
+    rows = []
+
+    for case, result in current["results"].items():
+        reference = baseline["results"].get(case)
+        if reference is None:
+            continue
+
+        before, after = reference["median"], result["median"]
+        ratio = after / before if before else float("inf")
+        regression = ratio > 1 + tolerance and after - before > NOISE_SECONDS
+        rows.append((case, before, after, ratio, regression))
+
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1].strip())
+    sizes = parser.add_mutually_exclusive_group()
+    sizes.add_argument("--quick", action="store_true", help="smallest sizes only")
+    sizes.add_argument(
+        "--full", action="store_true", help="up to 10,000 years x 5,000 rows"
+    )
+    parser.add_argument("-o", "--output", default="benchmark.json")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per case")
+    parser.add_argument(
+        "--budget", type=float, default=10.0, help="seconds per case, at most"
+    )
+    parser.add_argument("--compare", metavar="BASELINE", help="baseline results json")
+    parser.add_argument(
+        "--results", help="compare these results instead of running the suite"
+    )
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args(argv)
+
+    if args.results:
+        with open(args.results) as resultsFile:
+            current = json.load(resultsFile)
+
+    else:
+        # keep the benchmark's datasets | caches out of the app's store
+        workDir = tempfile.mkdtemp(prefix="dashdashboard-bench-")
+        os.environ["DATASTORE_DIR"] = os.path.join(workDir, "store")
+        os.environ["SNAPSHOT_DIR"] = os.path.join(workDir, "snapshots")
+        # time upload jobs in this process
+        os.environ["UPLOAD_WORKERS"] = "0"
+
+        # the largest sheets are bigger than the default upload limit
+        import utility
+
+        utility.MAX_UPLOAD_BYTES = max(utility.MAX_UPLOAD_BYTES, 2**32)
+
+        sizes = (
+            QUICK_SIZES if args.quick else FULL_SIZES if args.full else DEFAULT_SIZES
+        )
+        try:
+            current = run(sizes, args.repeat, args.budget)
+
+        finally:
+            shutil.rmtree(workDir, ignore_errors=True)
+
+        with open(args.output, "w") as outputFile:
+            json.dump(current, outputFile, indent=2)
+
+        for case, result in current["results"].items():
+            print(f"{case:<55} {result['median'] * 1000:>10.2f} ms")
+
+        print(f"[+] results written to `{args.output}`")
+
+    if not args.compare:
+        return 0
+
+    with open(args.compare) as baselineFile:
+        baseline = json.load(baselineFile)
+
+    regressions = 0
+    for case, before, after, ratio, regression in compare(
+        baseline, current, args.tolerance
+    ):
+        regressions += regression
+        flag = "REGRESSION" if regression else ""
+        print(
+            f"{case:<55} {before * 1000:>10.2f} ms -> {after * 1000:>10.2f} ms"
+            f" {ratio:>6.2f}x {flag}"
+        )
+
+    print(f"[{'!' if regressions else '+'}] {regressions} regression(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
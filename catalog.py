@@ -0,0 +1,271 @@
+"""
+dataset catalog
+
+every `.csv` | `.xls(x)` file under DATA_DIR (countries, scenarios, ...) is
+indexed at startup by a quick scan of its labels, without parsing any number:
+kind (`eco` indicators | `ait` trade stats blocks), format, rows, years, size
+and content hash. the index is kept in `<SNAPSHOT_DIR>/catalog.json`, so
+unchanged files are not even read again on the next start.
+
+a dataset is only parsed (or mapped from its snapshot, see snapshot.py) when
+someone selects it, parsed datasets are evicted least recently used first
+once they take more than DATASET_MEMORY_MB.
+"""
+
+import csv
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import openpyxl
+import pandas as pd
+
+import datastore
+import single_flight
+import snapshot
+from utility import YEAR_SEARCH_ROWS
+
+DATA_DIR = os.environ.get("DATA_DIR", "data")
+
+# parsed datasets kept in memory, in bytes
+MEMORY_BUDGET = int(os.environ.get("DATASET_MEMORY_MB", 256)) * 1024 * 1024
+
+INDEX_PATH = os.path.join(snapshot.SNAPSHOT_DIR, "catalog.json")
+
+FORMATS = (".csv", ".xlsx", ".xlsm", ".xls")
+
+# dataset id -> metadata, see scan_file
+_index = {}
+
+# dataset id -> (version, dataframe, bytes), most recently used last
+_loaded = OrderedDict()
+_lock = threading.Lock()
+
+stats = {"hits": 0, "loads": 0, "evictions": 0}
+
+
+def _label_rows(path):
+    # (first cell, row) of every row, the row itself only for `Year` rows
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8", errors="replace") as dataFile:
+            for row in csv.reader(dataFile):
+                label = row[0].strip().lower() if row else ""
+                yield label, row if label == "year" else None
+
+    elif path.lower().endswith(".xls"):
+        # legacy workbooks are read whole by xlrd anyway
+        for row in pd.read_excel(path, header=None).itertuples(index=False):
+            label = str(row[0]).strip().lower()
+            yield label, row if label == "year" else None
+
+    else:
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+
+        try:
+            # the sheet read_excel_rows would read
+            worksheet = next(
+                (
+                    worksheet
+                    for worksheet in workbook.worksheets
+                    if any(
+                        str(cell).strip().lower() == "year"
+                        for (cell,) in worksheet.iter_rows(
+                            max_row=YEAR_SEARCH_ROWS, max_col=1, values_only=True
+                        )
+                    )
+                ),
+                workbook.worksheets[0],
+            )
+
+            for number, (cell,) in enumerate(
+                worksheet.iter_rows(max_col=1, values_only=True), 1
+            ):
+                label = str(cell).strip().lower() if cell is not None else ""
+                if label != "year":
+                    yield label, None
+                    continue
+
+                yield label, next(
+                    worksheet.iter_rows(
+                        min_row=number, max_row=number, values_only=True
+                    )
+                )
+
+        finally:
+            workbook.close()
+
+
+def scan_file(path):
+    """
+    -> metadata of a data file, from its labels only
+    -> a file with several `Year` rows is taken for trade stats blocks
+    :param path: file path
+    :return: dict {"path", "kind", "format", "rows", "years", "size",
+             "mtime_ns", "hash"}
+    """
+
+    stat = os.stat(path)
+    rows = 0
+    yearRows = 0
+    years = 0
+
+    for label, row in _label_rows(path):
+        rows += 1
+
+        if row is not None:
+            yearRows += 1
+            if yearRows == 1:
+                years = sum(1 for cell in row[1:] if not pd.isna(cell) and cell != "")
+
+    if not yearRows:
+        raise ValueError("no `Year` row found")
+
+    return {
+        "path": path,
+        "kind": "ait" if yearRows > 1 else "eco",
+        "format": os.path.splitext(path)[1].lstrip(".").lower(),
+        "rows": rows,
+        "years": years,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "hash": snapshot.file_hash(path),
+    }
+
+
+def scan(dataDir=DATA_DIR):
+    """
+    -> index every data file under a directory, files unchanged since the last
+       scan (mtime | size) keep their metadata
+    :param dataDir: directory path
+    :return: dict dataset id (path relative to dataDir) -> metadata
+    """
+
+    try:
+        with open(INDEX_PATH) as indexFile:
+            previous = json.load(indexFile)
+
+    except (OSError, ValueError):
+        previous = {}
+
+    index = {}
+
+    for root, dirs, files in os.walk(dataDir):
+        # snapshots and other hidden directories
+        dirs[:] = sorted(name for name in dirs if not name.startswith("."))
+
+        for name in sorted(files):
+            if not name.lower().endswith(FORMATS):
+                continue
+
+            path = os.path.join(root, name)
+            datasetId = os.path.relpath(path, dataDir).replace(os.sep, "/")
+
+            try:
+                stat = os.stat(path)
+                entry = previous.get(datasetId)
+
+                if not (
+                    entry
+                    and entry["path"] == path
+                    and entry["size"] == stat.st_size
+                    and entry["mtime_ns"] == stat.st_mtime_ns
+                ):
+                    entry = scan_file(path)
+
+            except Exception as e:
+                print(f"[ERROR] Error indexing file: `{path}`. {e}")
+                continue
+
+            index[datasetId] = entry
+
+    # every worker scans at import, only a changed index is written
+    if index != previous:
+        try:
+            os.makedirs(os.path.dirname(INDEX_PATH) or ".", exist_ok=True)
+            datastore.write_atomic(
+                INDEX_PATH, lambda f: f.write(json.dumps(index).encode())
+            )
+
+        except OSError as e:
+            print(f"[ERROR] Error writing the dataset catalog. {e}")
+
+    with _lock:
+        _index.clear()
+        _index.update(index)
+
+        # datasets whose file changed are parsed again on their next load
+        for datasetId, (version, df, size) in list(_loaded.items()):
+            if index.get(datasetId, {}).get("hash") != version:
+                del _loaded[datasetId]
+
+    return index
+
+
+def options(kind):
+    """
+    -> dcc.Dropdown options of the catalog datasets of one kind
+    :param kind: `eco` | `ait`
+    :return: list of {"label", "value"}
+    """
+
+    with _lock:
+        entries = sorted(_index.items())
+
+    return [
+        {
+            "label": f"{datasetId} ({entry['rows']} rows, {entry['years']} years)",
+            "value": datasetId,
+        }
+        for datasetId, entry in entries
+        if entry["kind"] == kind
+    ]
+
+
+def _evict():
+    total = sum(size for version, df, size in _loaded.values())
+
+    # the dataset just loaded stays, even over budget
+    while total > MEMORY_BUDGET and len(_loaded) > 1:
+        version, df, size = _loaded.popitem(last=False)[1]
+        total -= size
+        stats["evictions"] += 1
+
+
+def load(datasetId):
+    """
+    -> a catalog dataset, parsed on first use and kept until evicted
+    :param datasetId: id from scan | options
+    :return: (version, pandas dataframe), the version is the file's hash
+    """
+
+    with _lock:
+        entry = _index.get(datasetId)
+        loaded = _loaded.get(datasetId)
+
+        if loaded is not None:
+            stats["hits"] += 1
+            _loaded.move_to_end(datasetId)
+            return loaded[:2]
+
+    if entry is None:
+        raise ValueError(f"unknown dataset `{datasetId}`")
+
+    def parse():
+        df = snapshot.load(entry["path"])
+        if df is None:
+            raise ValueError(f"dataset `{datasetId}` could not be processed")
+
+        return df
+
+    # sessions selecting the same dataset at once share one parse
+    df = single_flight.do(("catalog", datasetId, entry["hash"]), parse)
+    size = int(df.memory_usage(index=True, deep=True).sum())
+
+    with _lock:
+        if datasetId not in _loaded:
+            stats["loads"] += 1
+            _loaded[datasetId] = (entry["hash"], df, size)
+            _evict()
+
+        return _loaded[datasetId][:2]
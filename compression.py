@@ -0,0 +1,208 @@
+"""
+response compression
+
+dash only turns Flask-Compress on for gzip, and its default mimetypes leave
+out text/javascript, the type of every component bundle. here it negotiates
+brotli | gzip at fast levels for every json | html | css | js response over
+COMPRESS_MIN_SIZE bytes.
+
+static files (dash's component bundles, assets/) don't change between
+requests, they are compressed once per content hash at high levels and kept
+in memory, with a content hash ETag, and a year long Cache-Control when their
+URL is versioned (fingerprint | `?m=` mtime).
+
+callback responses get no ETag: dash-renderer never sends If-None-Match on
+its POSTs, so a 304 would never be served to a browser, and hashing every
+response would be wasted.
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import flask
+from flask_compress import Compress
+
+import single_flight
+
+try:
+    import brotli
+
+except ImportError:
+    # gzip only, Brotli is in requirements.txt
+    brotli = None
+
+# smallest response compressed, in bytes
+MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 500))
+
+MIMETYPES = [
+    "text/html",
+    "text/css",
+    "text/javascript",
+    "application/json",
+    "application/javascript",
+]
+
+# compressed static files kept in memory
+MAX_STATIC = 64
+
+# (path, content hash) -> {encoding: body}, most recently used last
+_static = OrderedDict()
+_lock = threading.Lock()
+
+stats = {"static_hits": 0, "static_misses": 0, "not_modified": 0}
+
+
+def accepted_encoding(header, bodies):
+    """
+    -> best encoding of a response for an `Accept-Encoding` header
+    :param header: str request header value
+    :param bodies: dict encoding -> body of the encodings available
+    :return: `br` | `gzip` | `identity`
+    """
+
+    # coding -> q value, `*` stands for the codings not listed
+    weights = {}
+
+    for token in header.split(","):
+        coding, *params = [part.strip() for part in token.split(";")]
+        weight = 1.0
+
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+
+                except ValueError:
+                    weight = 0.0
+
+        if coding:
+            weights[coding.lower()] = weight
+
+    for coding in ("br", "gzip"):
+        if coding in bodies and weights.get(coding, weights.get("*", 0.0)) > 0:
+            return coding
+
+    return "identity"
+
+
+def encode_all(body, gzipLevel=9, brotliQuality=11):
+    """
+    -> a response body in every encoding served, to compress once and reuse
+    :param body: bytes
+    :param gzipLevel: gzip compresslevel
+    :param brotliQuality: brotli quality
+    :return: dict content encoding (`identity` | `gzip` | `br`) -> bytes
+    """
+
+    bodies = {"identity": body, "gzip": gzip.compress(body, compresslevel=gzipLevel)}
+
+    if brotli is not None:
+        bodies["br"] = brotli.compress(body, quality=brotliQuality)
+
+    return bodies
+
+
+def _static_bodies(path, body):
+    key = (path, hashlib.blake2b(body, digest_size=16).hexdigest())
+
+    with _lock:
+        bodies = _static.get(key)
+
+        if bodies is not None:
+            stats["static_hits"] += 1
+            _static.move_to_end(key)
+            return key[1], bodies
+
+    # brotli 11 takes seconds on plotly.js, 9 is within a second
+    bodies = single_flight.do(
+        ("static", key), lambda: encode_all(body, gzipLevel=9, brotliQuality=9)
+    )
+
+    with _lock:
+        stats["static_misses"] += 1
+        _static[key] = bodies
+
+        while len(_static) > MAX_STATIC:
+            _static.popitem(last=False)
+
+    return key[1], bodies
+
+
+def init_app(app):
+    """
+    -> compress a dash app's responses, the app must be created with compress=False
+    :param app: dash app
+    """
+
+    server = app.server
+    server.config.update(
+        COMPRESS_ALGORITHM=["br", "gzip"],
+        COMPRESS_BR_LEVEL=4,
+        COMPRESS_LEVEL=6,
+        COMPRESS_MIN_SIZE=MIN_SIZE,
+        COMPRESS_MIMETYPES=MIMETYPES,
+    )
+
+    # registered first, so it runs after the hooks below (flask runs them reversed)
+    Compress(server)
+
+    prefix = app.config.routes_pathname_prefix
+    staticPaths = (
+        f"{prefix}_dash-component-suites/",
+        f"{prefix}{app.config.assets_url_path.strip('/')}/",
+    )
+
+    @server.after_request
+    def compress_static(response):
+        request = flask.request
+
+        if (
+            response.status_code != 200
+            or not request.path.startswith(staticPaths)
+            or response.mimetype not in MIMETYPES
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+
+        # file responses are streamed, read them once here
+        response.direct_passthrough = False
+        body = response.get_data()
+
+        if len(body) < MIN_SIZE:
+            return response
+
+        contentHash, bodies = _static_bodies(request.path, body)
+        coding = accepted_encoding(request.headers.get("Accept-Encoding", ""), bodies)
+
+        response.set_etag(
+            contentHash if coding == "identity" else f"{contentHash}-{coding}"
+        )
+        response.headers["Vary"] = "Accept-Encoding"
+
+        # versioned urls never serve other content
+        if response.cache_control.max_age == 31536000 or "m" in request.args:
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+
+        if response.get_etag()[0] in request.if_none_match:
+            with _lock:
+                stats["not_modified"] += 1
+
+            # no body: the full file's Content-Length | Type must not go along
+            notModified = flask.Response(status=304)
+            del notModified.headers["Content-Type"]
+
+            for name in ("ETag", "Cache-Control", "Vary"):
+                if name in response.headers:
+                    notModified.headers[name] = response.headers[name]
+
+            return notModified
+
+        response.set_data(bodies[coding])
+        if coding != "identity":
+            response.headers["Content-Encoding"] = coding
+
+        return response
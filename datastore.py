@@ -0,0 +1,261 @@
+"""
+shared dataset store
+
+parsed datasets are written once to a local directory as a `.npy` values
+matrix (memory-mapped by every worker) plus a small `.json` of labels | years.
+a `<name>.version` file holds the latest version, workers compare it on every
+callback and re-map the new files when an upload on another worker bumped it.
+a `<name>.source` file holds the key of the file the dataset was seeded from,
+so a changed bundled file is published again on the next start.
+"""
+
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+
+except ImportError:
+    # no file locking on windows, fine for the single process dev server
+    fcntl = None
+
+
+STORE_DIR = os.environ.get(
+    "DATASTORE_DIR", os.path.join(tempfile.gettempdir(), "dashdashboard-store")
+)
+
+# older versions kept on disk for workers still reading them
+KEEP_VERSIONS = 2
+
+# name -> (version, dataframe) mapped by this worker
+_mapped = {}
+
+
+def _path(name, suffix):
+    return os.path.join(STORE_DIR, f"{name}{suffix}")
+
+
+@contextmanager
+def _locked(name):
+    os.makedirs(STORE_DIR, exist_ok=True)
+
+    with open(_path(name, ".lock"), "a") as lockFile:
+        if fcntl:
+            fcntl.flock(lockFile, fcntl.LOCK_EX)
+
+        try:
+            yield
+
+        finally:
+            if fcntl:
+                fcntl.flock(lockFile, fcntl.LOCK_UN)
+
+
+def write_atomic(path, write):
+    tmpPath = f"{path}.{os.getpid()}.tmp"
+
+    with open(tmpPath, "wb") as tmpFile:
+        write(tmpFile)
+
+    os.replace(tmpPath, path)
+
+
+def current_version(name):
+    """
+    -> latest published version of a dataset
+    :param name: dataset name
+    :return: int version | None if nothing was published yet
+    """
+
+    try:
+        with open(_path(name, ".version")) as versionFile:
+            return int(versionFile.read())
+
+    except (OSError, ValueError):
+        return None
+
+
+def publish(name, df, key=None):
+    """
+    -> write a parsed dataset to the store as a new version
+    :param name: dataset name
+    :param df: pandas dataframe from parse_data
+    :param key: upload content key the dataset was parsed from, if any
+    :return: int new version
+    """
+
+    with _locked(name):
+        version = (current_version(name) or 0) + 1
+        return _publish_locked(name, df, version, key)
+
+
+def save_frame(path, df, key=None, changed=None):
+    """
+    -> write a float64 frame as `<path>.npy` values + `<path>.json` labels | years
+    :param path: file path without suffix
+    :param df: pandas dataframe from parse_data
+    :param key: optional upload content key, see upload_cache
+    :param changed: optional {"base": version, "years", "blocks"} of a frame
+                    derived from a previous version, see update
+    """
+
+    meta = {
+        "index": df.index.tolist(),
+        "index_names": list(df.index.names),
+        "columns": df.columns.tolist(),
+        "columns_name": df.columns.name,
+        "key": key,
+        "changed": changed,
+    }
+
+    values = np.ascontiguousarray(df.to_numpy(dtype="float64"))
+    write_atomic(f"{path}.npy", lambda f: np.save(f, values))
+    write_atomic(f"{path}.json", lambda f: f.write(json.dumps(meta).encode()))
+
+
+def _publish_locked(name, df, version, key=None, changed=None):
+    save_frame(_path(name, f"-{version}"), df, key, changed)
+    write_atomic(_path(name, ".version"), lambda f: f.write(str(version).encode()))
+
+    for old in range(version - KEEP_VERSIONS, 0, -1):
+        try:
+            os.remove(_path(name, f"-{old}.npy"))
+            os.remove(_path(name, f"-{old}.json"))
+
+        except OSError:
+            break
+
+    return version
+
+
+def update(name, merge):
+    """
+    -> publish a new version derived from the latest one, e.g an appended upload
+    -> runs under the dataset lock, so concurrent updates never lose each other
+    :param name: dataset name
+    :param merge: callable (latest pandas dataframe) -> (pandas dataframe,
+                  key | None, changed {"years", "blocks"})
+    :return: int new version
+    """
+
+    with _locked(name):
+        version = current_version(name)
+        if version is None:
+            raise ValueError(f"no `{name}` dataset to update")
+
+        df, key, changed = merge(map_frame(_path(name, f"-{version}")))
+        changed = dict(changed, base=version)
+
+        return _publish_locked(name, df, version + 1, key, changed)
+
+
+def current_source(name):
+    """
+    -> source key the dataset was last seeded from by setdefault
+    :param name: dataset name
+    :return: str key | None if it was never seeded with one
+    """
+
+    try:
+        with open(_path(name, ".source")) as sourceFile:
+            return sourceFile.read() or None
+
+    except OSError:
+        return None
+
+
+def setdefault(name, loader, source=None):
+    """
+    -> publish a dataset if the store doesn't hold one yet, or holds one seeded
+       from another source (e.g the bundled file changed since)
+    -> the first worker to boot parses the file, the others just map it
+    -> versions published on top of the seed (uploads) are kept while the
+       source is unchanged
+    :param name: dataset name
+    :param loader: callable returning a pandas dataframe
+    :param source: optional key of the data loader reads, e.g its file hash
+    :return: int current version
+    """
+
+    def current():
+        return current_version(name) is not None and (
+            source is None or current_source(name) == source
+        )
+
+    if current():
+        return current_version(name)
+
+    with _locked(name):
+        if not current():
+            df = loader()
+            version = (current_version(name) or 0) + 1
+            _publish_locked(name, df, version, df.attrs.get("key"))
+
+            if source is not None:
+                write_atomic(_path(name, ".source"), lambda f: f.write(source.encode()))
+
+        return current_version(name)
+
+
+def map_frame(path):
+    """
+    -> memory-map a frame written by save_frame (read only, zero-copy)
+    -> the upload content key is kept in df.attrs["key"], what changed since
+       the version it was derived from (see update) in df.attrs["changed"]
+    :param path: file path without suffix
+    :return: pandas dataframe
+    """
+
+    with open(f"{path}.json") as metaFile:
+        meta = json.load(metaFile)
+
+    if len(meta["index_names"]) > 1:
+        index = pd.MultiIndex.from_tuples(meta["index"], names=meta["index_names"])
+
+    else:
+        index = pd.Index(meta["index"], name=meta["index_names"][0])
+
+    df = pd.DataFrame(
+        np.load(f"{path}.npy", mmap_mode="r"),
+        index=index,
+        columns=pd.Index(meta["columns"], name=meta["columns_name"]),
+        copy=False,
+    )
+    df.attrs["key"] = meta.get("key")
+    df.attrs["changed"] = meta.get("changed")
+
+    return df
+
+
+def load(name):
+    """
+    -> latest version of a dataset, memory-mapped (read only, zero-copy)
+    -> re-maps only when another worker published a newer version
+    :param name: dataset name
+    :return: (version, pandas dataframe) | (None, None) if nothing was published
+    """
+
+    version = current_version(name)
+    mapped = _mapped.get(name)
+
+    if mapped and mapped[0] == version:
+        return mapped
+
+    if version is None:
+        return None, None
+
+    try:
+        df = map_frame(_path(name, f"-{version}"))
+
+    except FileNotFoundError:
+        # cleaned up by newer uploads in between, map the latest one instead
+        version = current_version(name)
+        df = map_frame(_path(name, f"-{version}"))
+
+    _mapped[name] = (version, df)
+    return _mapped[name]
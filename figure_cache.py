@@ -0,0 +1,101 @@
+"""
+btei-graph figure cache
+
+each industry's series is serialized to JSON once per (dataset version,
+industry) and reused for every session until an upload publishes a new
+version. Dash then only has to encode a string instead of walking the float
+lists on every response; the browser parses it back in assets/chart.js.
+
+a version merged from an appended upload keeps the previous version's series
+of every industry block the upload didn't change (df.attrs["changed"]).
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import plotly.utils
+
+from utility import INDUSTRIES, industry_series, industry_title
+
+MAX_ENTRIES = int(os.environ.get("FIGURE_CACHE_SIZE", 32))
+
+# (dataset, version, industry) -> json string, most recently used last
+_figures = OrderedDict()
+_lock = threading.Lock()
+
+stats = {"hits": 0, "misses": 0}
+
+
+def _invalidate(name, *versions):
+    # drop figures of older versions of the same dataset
+    for key in [key for key in _figures if key[0] == name and key[1] not in versions]:
+        del _figures[key]
+
+
+def _unchanged_since(df, industry):
+    # version the industry's series is the same as, if df was merged from it
+    changed = df.attrs.get("changed")
+
+    if not changed or df.index.nlevels == 1:
+        return None
+
+    if industry_title(list(df.index.unique(level=0)), industry) in changed["blocks"]:
+        return None
+
+    return changed["base"]
+
+
+def industry_json(name, version, df, industry):
+    """
+    -> industry_series of a dataset version, serialized once
+    :param name: dataset name in the datastore
+    :param version: dataset version, a new one invalidates the older figures
+    :param df: trade stats pandas dataframe of that version
+    :param industry: one of INDUSTRIES
+    :return: str json
+    """
+
+    key = (name, version, industry)
+
+    with _lock:
+        figure = _figures.get(key)
+
+        if figure is not None:
+            stats["hits"] += 1
+            _figures.move_to_end(key)
+            return figure
+
+        figure = _figures.get((name, _unchanged_since(df, industry), industry))
+        stats["hits" if figure is not None else "misses"] += 1
+
+    if figure is None:
+        figure = json.dumps(
+            industry_series(df, industry), cls=plotly.utils.PlotlyJSONEncoder
+        )
+
+    with _lock:
+        # the version df was merged from may still serve the next industry
+        _invalidate(name, version, (df.attrs.get("changed") or {}).get("base"))
+        _figures[key] = figure
+
+        while len(_figures) > MAX_ENTRIES:
+            _figures.popitem(last=False)
+
+    return figure
+
+
+def trade_series_json(name, version, df):
+    """
+    -> btei-data store contents: both industries' series as json strings
+    :param name: dataset name in the datastore
+    :param version: dataset version
+    :param df: trade stats pandas dataframe of that version
+    :return: dict industry -> str json
+    """
+
+    return {
+        industry.lower(): industry_json(name, version, df, industry)
+        for industry in INDUSTRIES
+    }
@@ -0,0 +1,255 @@
+"""
+background upload jobs
+
+an upload is parsed and published to the shared dataset store by a local
+process pool, so the worker that received it goes back to serving callbacks
+right away. the callback gets a job id, the page polls the job's status (a
+small `.json` file in the store, readable by every gunicorn worker) with a
+dcc.Interval and maps the new dataset version once it is done.
+
+an appended upload (only new years | revised cells) is merged into the
+latest version instead of replacing it, see utility.merge_frames.
+
+UPLOAD_WORKERS=0 parses in the calling worker instead (dev server, benchmark).
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import datastore
+import snapshot
+import upload_cache
+from utility import decode_upload, merge_frames, update_summary
+
+JOBS_DIR = os.path.join(datastore.STORE_DIR, "jobs")
+
+# processes parsing uploads, per web worker
+MAX_WORKERS = int(os.environ.get("UPLOAD_WORKERS", 2))
+
+# job status files kept on disk
+MAX_JOBS = 100
+
+# uuid4().hex, see submit
+JOB_ID = re.compile(r"[0-9a-f]{32}")
+
+_pool = None
+_poolPid = None
+_lock = threading.Lock()
+
+
+def _status_path(jobId):
+    return os.path.join(JOBS_DIR, f"{jobId}.json")
+
+
+def _spool_path(jobId):
+    return os.path.join(JOBS_DIR, f"{jobId}.upload")
+
+
+def _set_status(jobId, **status):
+    datastore.write_atomic(
+        _status_path(jobId), lambda f: f.write(json.dumps(status).encode())
+    )
+
+
+def _prune():
+    # statuses only, a spooled upload is removed by its own job
+    try:
+        files = [
+            os.path.join(JOBS_DIR, name)
+            for name in os.listdir(JOBS_DIR)
+            if name.endswith(".json")
+        ]
+
+    except OSError:
+        return
+
+    files.sort(key=os.path.getmtime)
+
+    for path in files[: max(len(files) - MAX_JOBS, 0)]:
+        try:
+            os.remove(path)
+
+        except OSError:
+            pass
+
+
+def _merge(name, key, df):
+    """
+    -> datastore.update callable merging a parsed upload into a dataset, the
+       eco summary of the result is derived from the previous one
+    """
+
+    def merge(base):
+        merged, changed = merge_frames(base, df)
+        mergedKey = upload_cache.merge_key(base, key)
+
+        if name == "eco" and mergedKey is not None:
+            values, changes = upload_cache.summary(base)
+            upload_cache.put(
+                mergedKey,
+                update_summary(merged, changes, changed["years"])[1],
+                part="summary",
+            )
+
+        return merged, mergedKey, changed
+
+    return merge
+
+
+def run(jobId, name, filename, key, append=False):
+    """
+    -> parse a spooled upload and publish it as the new version of a dataset
+    -> runs in a pool process, the outcome is only reported through status()
+    :param jobId: id from submit, the upload bytes are in its spool file
+    :param name: dataset name
+    :param filename: uploaded file name
+    :param key: content_key of the upload
+    :param append: merge the upload into the latest version instead
+    """
+
+    _set_status(jobId, state="running", name=name, filename=filename)
+    start = time.perf_counter()
+
+    try:
+        df = upload_cache.parse_spooled(filename, _spool_path(jobId), key)
+
+        if df is None:
+            _set_status(
+                jobId,
+                state="failed",
+                name=name,
+                filename=filename,
+                error="the file could not be processed",
+            )
+            return
+
+        seconds = time.perf_counter() - start
+
+        if append:
+            snapshot.seed(name)
+            version = datastore.update(name, _merge(name, key, df))
+
+        else:
+            version = datastore.publish(name, df, key)
+
+        # summarize here too, workers then read it from the upload cache
+        if name == "eco":
+            upload_cache.summary(datastore.load(name)[1])
+
+    except Exception as e:
+        print(f"[ERROR] Error processing file: `{filename}`. {e}")
+        _set_status(jobId, state="failed", name=name, filename=filename, error=str(e))
+        return
+
+    finally:
+        _remove_spool(jobId)
+
+    _set_status(
+        jobId,
+        state="done",
+        name=name,
+        filename=filename,
+        version=version,
+        seconds=seconds,
+    )
+
+
+def _executor():
+    global _pool, _poolPid
+
+    # a pool created before gunicorn forked belongs to the parent
+    with _lock:
+        if _pool is None or _poolPid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS)
+            _poolPid = os.getpid()
+
+        return _pool
+
+
+def _remove_spool(jobId):
+    try:
+        os.remove(_spool_path(jobId))
+
+    except OSError:
+        pass
+
+
+def submit(name, filename, contents, append=False):
+    """
+    -> queue an upload for parsing, see run
+    -> the payload is decoded here, into a spool file in the store: the pool
+       process gets its path, not another copy of the base64 contents
+    :param name: dataset name
+    :param filename: uploaded file name
+    :param contents: dcc.Upload contents
+    :param append: merge the upload into the latest version instead
+    :return: str job id
+    """
+
+    jobId = uuid.uuid4().hex
+
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    _prune()
+
+    try:
+        key = upload_cache.content_key(filename, contents)
+        buffer = decode_upload(contents)
+        datastore.write_atomic(
+            _spool_path(jobId), lambda f: f.write(buffer.getbuffer())
+        )
+        del buffer
+
+    except (OSError, ValueError) as e:
+        # too large, not base64, disk full: no job to run
+        print(f"[ERROR] Error processing file: `{filename}`. {e}")
+        _set_status(jobId, state="failed", name=name, filename=filename, error=str(e))
+        return jobId
+
+    _set_status(jobId, state="queued", name=name, filename=filename)
+
+    if MAX_WORKERS <= 0:
+        run(jobId, name, filename, key, append)
+        return jobId
+
+    def report_crash(future):
+        # the pool process died (killed, out of memory) before reporting
+        if future.exception() is not None:
+            _remove_spool(jobId)
+            _set_status(
+                jobId,
+                state="failed",
+                name=name,
+                filename=filename,
+                error=str(future.exception()),
+            )
+
+    _executor().submit(run, jobId, name, filename, key, append).add_done_callback(
+        report_crash
+    )
+
+    return jobId
+
+
+def status(jobId):
+    """
+    -> current status of an upload job, from any worker
+    :param jobId: id from submit
+    :return: dict, `state` is queued | running | done | failed | unknown,
+             done jobs have the published `version` and parse `seconds`
+    """
+
+    # the id comes back from the browser, it must not name any other file
+    if not (isinstance(jobId, str) and JOB_ID.fullmatch(jobId)):
+        return {"state": "unknown"}
+
+    try:
+        with open(_status_path(jobId)) as statusFile:
+            return json.load(statusFile)
+
+    except (OSError, ValueError):
+        return {"state": "unknown"}
@@ -0,0 +1,107 @@
+"""
+serialized `/_dash-layout` responses
+
+dash json-encodes the whole layout tree on every `/_dash-layout` request, and
+Flask-Compress gzips it again, for every new visitor. here the encoded layout
+is kept per dataset version along with its gzip | brotli encodings, each
+request only picks the encoding the browser accepts. an ETag lets browsers
+revalidate a layout they already have with a bodyless 304.
+"""
+
+import hashlib
+import json
+import threading
+
+import flask
+import plotly.utils
+
+import single_flight
+from compression import accepted_encoding, encode_all
+
+# (version, {encoding: body}, etag) of the layout served last
+_cached = None
+
+stats = {"hits": 0, "misses": 0, "not_modified": 0}
+
+# guards stats only, _cached is swapped whole
+_lock = threading.Lock()
+
+
+def encode(layout):
+    """
+    -> a layout as dash serializes it, plus its gzip | brotli encodings
+    :param layout: dash component tree
+    :return: dict content encoding (`identity` | `gzip` | `br`) -> bytes
+    """
+
+    body = json.dumps(layout, cls=plotly.utils.PlotlyJSONEncoder).encode()
+
+    return encode_all(body, gzipLevel=9, brotliQuality=11)
+
+
+def _layout(app, version):
+    global _cached
+
+    cached = _cached
+    if cached is not None and cached[0] == version:
+        with _lock:
+            stats["hits"] += 1
+
+        return cached
+
+    def build():
+        with _lock:
+            stats["misses"] += 1
+
+        # dash's own layout getter: calls the layout function if it is one
+        bodies = encode(app._layout_value())
+        etag = hashlib.blake2b(bodies["identity"], digest_size=16).hexdigest()
+
+        return version, bodies, etag
+
+    # swapped whole, threads serving the old version keep reading theirs
+    cached = _cached = single_flight.do(("layout", version), build)
+    return cached
+
+
+def init_app(app, version, auth=None):
+    """
+    -> serve dash's `/_dash-layout` from the cache
+    :param app: dash app
+    :param version: callable returning the (hashable) version of every dataset
+                    the layout shows, a new one re-encodes it
+    :param auth: dash_auth BasicAuth guarding the app
+    """
+
+    endpoint = f"{app.config.routes_pathname_prefix}_dash-layout"
+
+    def serve_cached_layout():
+        layoutVersion, bodies, etag = _layout(app, version())
+        coding = accepted_encoding(
+            flask.request.headers.get("Accept-Encoding", ""), bodies
+        )
+
+        # one etag per encoding, they are different bytes
+        response = flask.Response(mimetype="application/json")
+        response.set_etag(etag if coding == "identity" else f"{etag}-{coding}")
+        response.headers["Vary"] = "Accept-Encoding"
+        response.headers["Cache-Control"] = "no-cache"
+
+        if response.get_etag()[0] in flask.request.if_none_match:
+            with _lock:
+                stats["not_modified"] += 1
+
+            response.status_code = 304
+            return response
+
+        # Flask-Compress leaves responses with a Content-Encoding alone
+        response.set_data(bodies[coding])
+        if coding != "identity":
+            response.headers["Content-Encoding"] = coding
+
+        return response
+
+    if auth is not None:
+        serve_cached_layout = auth.auth_wrapper(serve_cached_layout)
+
+    app.server.view_functions[endpoint] = serve_cached_layout
@@ -0,0 +1,496 @@
+"""
+load test
+
+starts the app locally (gunicorn, one worker mode at a time) and replays
+analyst sessions against it over http, with BasicAuth: the page + layout
+fetch, summary year changes, trade stats dataset switches and the odd eco
+upload followed by its status polls. virtual users are ramped up in stages,
+every stage reports p50 | p95 | p99 latency and throughput per callback.
+
+    python loadtest.py                                  # default modes and stages
+    python loadtest.py --modes sync:1 gthread:1x4 gthread:2x4 --users 1 10 50
+    python loadtest.py --modes dev                      # `python app.py`, no gunicorn
+    python loadtest.py --url https://... --users 5      # a server already running
+
+worker modes: `sync:<workers>`, `gthread:<workers>x<threads>` (gunicorn) and
+`dev` (dash's threaded development server). the industry toggles run in the
+browser (clientside callback), a session switches the trade stats dataset
+instead, the server side callback feeding that chart.
+"""
+
+import argparse
+import base64
+import itertools
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+from faker import Faker
+
+from benchmark import csv_upload, indicator_rows
+
+DEFAULT_MODES = ["sync:1", "sync:4", "gthread:1x4", "gthread:4x4"]
+
+# concurrent virtual users of each stage
+DEFAULT_USERS = [1, 5, 10, 25]
+
+# demo account, see app_users.py
+DEFAULT_CREDENTIALS = os.environ.get("LOADTEST_USER", "user1:test1")
+
+# seconds between two actions of a user, on average
+THINK_SECONDS = 0.5
+
+# share of sessions uploading an eco sheet
+UPLOAD_SHARE = 0.1
+
+# distinct sheets uploaded, 30 years x 17 indicators like data/eco-ind.csv
+UPLOAD_SHEETS = 8
+
+# seconds to wait for the app to answer after its start
+START_TIMEOUT = 120
+
+
+def percentile(values, share):
+    """
+    -> nearest rank percentile
+    :param values: sorted list
+    :param share: 0..1
+    """
+
+    if not values:
+        return float("nan")
+
+    return values[min(len(values) - 1, max(0, round(share * len(values)) - 1))]
+
+
+def find_component(tree, componentId):
+    """
+    -> props of the component with an id in a `/_dash-layout` tree, None if missing
+    """
+
+    if isinstance(tree, list):
+        for child in tree:
+            found = find_component(child, componentId)
+            if found is not None:
+                return found
+
+    elif isinstance(tree, dict):
+        props = tree.get("props", {})
+        if props.get("id") == componentId:
+            return props
+
+        return find_component(props.get("children"), componentId)
+
+    return None
+
+
+def callback_outputs(dependencies, outputId):
+    """
+    -> `output` key of the server callback updating a component id
+    :param dependencies: `/_dash-dependencies` json
+    """
+
+    for callback in dependencies:
+        if callback.get("clientside_function"):
+            continue
+
+        if any(
+            part.rsplit(".", 1)[0] == outputId
+            for part in callback["output"].strip(".").split("...")
+        ):
+            return callback["output"]
+
+    raise ValueError(f"no callback updates `{outputId}`")
+
+
+class Session:
+    """
+    one virtual user: a browser tab, cookies kept, timing every request
+    """
+
+    def __init__(self, url, credentials, record, uploads):
+        self.url = url.rstrip("/")
+        self.record = record
+        self.uploads = uploads
+        self.http = requests.Session()
+        self.http.auth = tuple(credentials.split(":", 1))
+
+    def request(self, name, method, path, **kwargs):
+        start = time.perf_counter()
+
+        try:
+            response = self.http.request(method, self.url + path, timeout=60, **kwargs)
+            failed = response.status_code >= 400
+
+        except requests.RequestException:
+            response, failed = None, True
+
+        self.record(name, time.perf_counter() - start, failed)
+        return response if not failed else None
+
+    def callback(self, name, output, inputs, state=(), changed=None):
+        body = {
+            "output": output,
+            "inputs": [
+                {"id": componentId, "property": prop, "value": value}
+                for componentId, prop, value in inputs
+            ],
+            "state": [
+                {"id": componentId, "property": prop, "value": value}
+                for componentId, prop, value in state
+            ],
+            "changedPropIds": [changed or f"{inputs[0][0]}.{inputs[0][1]}"],
+        }
+
+        response = self.request(name, "POST", "/_dash-update-component", json=body)
+        if response is None or response.status_code == 204:
+            return None
+
+        return response.json().get("response", {})
+
+    def run(self, stop):
+        if self.request("index", "GET", "/") is None:
+            return
+
+        layout = self.request("layout", "GET", "/_dash-layout")
+        dependencies = self.request("dependencies", "GET", "/_dash-dependencies")
+        if layout is None or dependencies is None:
+            return
+
+        layout, dependencies = layout.json(), dependencies.json()
+
+        summaryOutput = callback_outputs(dependencies, "summary-year-value")
+        btei = callback_outputs(dependencies, "btei-data")
+        upload = callback_outputs(dependencies, "ei-upload-job")
+        uploadJob = callback_outputs(dependencies, "eco-version")
+
+        years = [
+            option["value"]
+            for option in find_component(layout, "summary-year-filter")["options"]
+        ]
+        datasets = [
+            option["value"]
+            for option in find_component(layout, "ait-dataset")["options"]
+        ]
+        ecoVersion = find_component(layout, "eco-version").get("data")
+        uploader = random.random() < UPLOAD_SHARE
+
+        while not stop.is_set():
+            time.sleep(random.expovariate(1 / THINK_SECONDS))
+            action = random.random()
+
+            if uploader and action < 0.1:
+                ecoVersion = self.upload(upload, uploadJob, stop) or ecoVersion
+
+            elif action < 0.7:
+                self.callback(
+                    "summary_year",
+                    summaryOutput,
+                    [
+                        ("summary-year-filter", "value", random.choice(years)),
+                        ("eco-version", "data", ecoVersion),
+                        ("eco-dataset", "value", None),
+                    ],
+                )
+
+            else:
+                self.callback(
+                    "ait_dataset",
+                    btei,
+                    [
+                        ("ait-upload-poll", "n_intervals", None),
+                        ("ait-upload-job", "data", None),
+                        ("ait-dataset", "value", random.choice(datasets)),
+                    ],
+                    changed="ait-dataset.value",
+                )
+
+    def upload(self, upload, uploadJob, stop):
+        """
+        -> eco version of the uploaded sheet once processed, None otherwise
+        """
+
+        filename, contents = random.choice(self.uploads)
+        response = self.callback(
+            "upload",
+            upload,
+            [
+                ("upload-ei-data", "contents", contents),
+                ("upload-ei-data", "filename", filename),
+            ],
+            [("upload-mode", "value", [])],
+        )
+        if response is None:
+            return None
+
+        # single output callbacks answer {"props": {...}}, others {id: {...}}
+        props = response.get("props") or response.get("ei-upload-job", {})
+        jobId = props.get("data")
+
+        # the browser polls every second until the job is done
+        for interval in itertools.count(1):
+            if stop.is_set() or interval > 60:
+                return None
+
+            status = self.callback(
+                "upload_poll",
+                uploadJob,
+                [
+                    ("ei-upload-poll", "n_intervals", interval),
+                    ("ei-upload-job", "data", jobId),
+                    ("eco-dataset", "value", None),
+                ],
+                [("summary-year-filter", "value", None)],
+                changed="ei-upload-poll.n_intervals",
+            )
+
+            if status and status.get("ei-upload-poll", {}).get("disabled"):
+                # the new version, sent with the next summary year changes
+                return status.get("eco-version", {}).get("data")
+
+            time.sleep(1)
+
+
+def run_stage(url, users, seconds, credentials, uploads):
+    """
+    -> replay `users` concurrent sessions for `seconds`
+    :return: dict callback name -> {"count", "errors", "p50", "p95", "p99",
+             "throughput"}, latencies in seconds, throughput per second
+    """
+
+    samples = {}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def record(name, seconds, failed):
+        with lock:
+            samples.setdefault(name, []).append((seconds, failed))
+
+    threads = []
+    start = time.perf_counter()
+
+    for user in range(users):
+        session = Session(url, credentials, record, uploads)
+        thread = threading.Thread(target=session.run, args=(stop,), daemon=True)
+        threads.append(thread)
+        thread.start()
+
+        # users arrive over the first second, not all at once
+        time.sleep(1 / users)
+
+    time.sleep(seconds)
+    stop.set()
+    elapsed = time.perf_counter() - start
+
+    for thread in threads:
+        thread.join(timeout=60)
+    results = {}
+
+    for name, values in sorted(samples.items()):
+        latencies = sorted(seconds for seconds, failed in values if not failed)
+        results[name] = {
+            "count": len(values),
+            "errors": sum(failed for seconds, failed in values),
+            "p50": percentile(latencies, 0.5),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "throughput": len(values) / elapsed,
+        }
+
+    return results
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def server_command(mode, port):
+    """
+    -> command starting the app in a worker mode
+    :param mode: `sync:<workers>` | `gthread:<workers>x<threads>` | `dev`
+    """
+
+    if mode == "dev":
+        return [
+            sys.executable,
+            "-c",
+            f"import app; app.app.run_server(port={port}, debug=False, threaded=True)",
+        ]
+
+    workerClass, _, size = mode.partition(":")
+    workers, _, threads = size.partition("x")
+
+    if workerClass not in ("sync", "gthread") or not workers.isdigit():
+        raise ValueError(f"unknown worker mode `{mode}`")
+
+    return [
+        sys.executable,
+        "-m",
+        "gunicorn",
+        "app:server",
+        "--bind",
+        f"127.0.0.1:{port}",
+        "--worker-class",
+        workerClass,
+        "--workers",
+        workers,
+        "--threads",
+        threads or "1",
+        "--timeout",
+        "120",
+    ]
+
+
+def start_server(mode, workDir):
+    """
+    -> (process, url) of the app started in a worker mode, ready for requests
+    :param workDir: scratch directory of this mode only, a mode starting on
+                    the previous one's store would skip its cold start
+    """
+
+    port = free_port()
+    env = dict(
+        os.environ,
+        # uploads, snapshots and the catalog go to scratch, not the app's
+        DATASTORE_DIR=os.path.join(workDir, "store"),
+        SNAPSHOT_DIR=os.path.join(workDir, "snapshots"),
+        # every worker accepts every worker's session cookie
+        SESSION_SECRET=base64.b64encode(os.urandom(24)).decode(),
+    )
+
+    logPath = os.path.join(workDir, "server.log")
+
+    with open(logPath, "wb") as log:
+        process = subprocess.Popen(
+            server_command(mode, port),
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=log,
+        )
+
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + START_TIMEOUT
+
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            with open(logPath, errors="replace") as log:
+                lastLine = (log.read().strip().splitlines() or [""])[-1]
+
+            raise RuntimeError(f"the server exited: {lastLine}")
+
+        try:
+            requests.get(url, timeout=5)
+            return process, url
+
+        except requests.RequestException:
+            time.sleep(0.5)
+
+    process.kill()
+    raise RuntimeError(f"the server didn't answer within {START_TIMEOUT} s")
+
+
+def stop_server(process):
+    process.terminate()
+
+    try:
+        process.wait(timeout=30)
+
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def print_stage(mode, users, results):
+    print(f"\n{mode}, {users} user(s)")
+    print(
+        f"{'callback':<16} {'requests':>9} {'errors':>7} {'p50 ms':>9}"
+        f" {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8}"
+    )
+
+    for name, result in results.items():
+        print(
+            f"{name:<16} {result['count']:>9} {result['errors']:>7}"
+            f" {result['p50'] * 1000:>9.1f} {result['p95'] * 1000:>9.1f}"
+            f" {result['p99'] * 1000:>9.1f} {result['throughput']:>8.1f}"
+        )
+
+    total = sum(result["throughput"] for result in results.values())
+    print(f"{'total':<16} {'':>9} {'':>7} {'':>9} {'':>9} {'':>9} {total:>8.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1].strip())
+    parser.add_argument(
+        "--modes", nargs="+", default=DEFAULT_MODES, help="worker modes compared"
+    )
+    parser.add_argument(
+        "--url", help="load test a server already running instead of starting one"
+    )
+    parser.add_argument(
+        "--users", nargs="+", type=int, default=DEFAULT_USERS, help="users per stage"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=20.0, help="seconds per stage"
+    )
+    parser.add_argument(
+        "--credentials",
+        default=DEFAULT_CREDENTIALS,
+        help="`user:password` of an app_users account",
+    )
+    parser.add_argument("-o", "--output", default="loadtest.json")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    fake = Faker()
+    fake.seed_instance(args.seed)
+    uploads = [
+        (f"loadtest-{sheet}.csv", csv_upload(indicator_rows(fake, 30, 17)))
+        for sheet in range(UPLOAD_SHEETS)
+    ]
+
+    results = {}
+
+    for mode in [args.url] if args.url else args.modes:
+        workDir = tempfile.mkdtemp(prefix="dashdashboard-loadtest-")
+
+        try:
+            process, url = (None, mode) if args.url else start_server(mode, workDir)
+
+        except (RuntimeError, ValueError) as e:
+            print(f"[ERROR] Error starting the app in mode `{mode}`. {e}")
+            shutil.rmtree(workDir, ignore_errors=True)
+            continue
+
+        try:
+            results[mode] = {}
+            for users in args.users:
+                stage = run_stage(url, users, args.duration, args.credentials, uploads)
+                results[mode][users] = stage
+                print_stage(mode, users, stage)
+
+        finally:
+            if process is not None:
+                stop_server(process)
+
+            shutil.rmtree(workDir, ignore_errors=True)
+
+    with open(args.output, "w") as outputFile:
+        json.dump(results, outputFile, indent=2)
+
+    print(f"[+] results written to `{args.output}`")
+    return 0 if results else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""
+callback | dataset metrics, opt-in with METRICS=1
+
+every `/_dash-update-component` request is counted per callback with its
+latency (histogram), response bytes (as serialized, before compression) and
+errors, and every dataset a worker loads gets its parse time and memory
+footprint. all of it is served as prometheus text on `/metrics`, behind the
+app's BasicAuth unless METRICS_PUBLIC=1.
+
+counters are per worker process, scrape each gunicorn worker (or run one).
+"""
+
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+
+import flask
+
+ENABLED = os.environ.get("METRICS", "") == "1"
+PUBLIC = os.environ.get("METRICS_PUBLIC", "") == "1"
+
+# latency histogram upper bounds, in seconds (+Inf is implied)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# callback name -> [bucket counts..., +Inf count, latency sum, bytes sum, errors]
+_callbacks = {}
+
+# dataset name -> {"version", "rows", "years", "bytes", "parse_seconds"}
+_datasets = {}
+
+_lock = threading.Lock()
+
+
+def observe_callback(name, seconds, size, failed=False):
+    """
+    -> count one callback response
+    :param name: callback function name
+    :param seconds: latency
+    :param size: response body bytes, uncompressed
+    :param failed: True for an error response
+    """
+
+    bucket = bisect_left(BUCKETS, seconds)
+
+    with _lock:
+        counts = _callbacks.get(name)
+        if counts is None:
+            counts = _callbacks[name] = [0] * (len(BUCKETS) + 4)
+
+        counts[bucket] += 1
+        counts[-3] += seconds
+        counts[-2] += size
+        counts[-1] += failed
+
+
+def observe_parse(name, seconds):
+    """
+    -> time spent parsing | loading a dataset (upload or bundled file)
+    :param name: dataset name
+    :param seconds: parse time
+    """
+
+    if ENABLED:
+        with _lock:
+            _datasets.setdefault(name, {})["parse_seconds"] = seconds
+
+
+def observe_dataset(name, version, df):
+    """
+    -> size of the dataset version a worker now serves
+    :param name: dataset name
+    :param version: datastore version
+    :param df: pandas dataframe
+    """
+
+    if not ENABLED:
+        return
+
+    # once per version, the index labels are the only python objects
+    size = int(df.memory_usage(index=True, deep=True).sum())
+
+    with _lock:
+        _datasets.setdefault(name, {}).update(
+            version=version, rows=df.shape[0], years=df.shape[1], bytes=size
+        )
+
+
+def render():
+    """
+    -> every metric in prometheus text format
+    :return: str
+    """
+
+    with _lock:
+        callbacks = {name: list(counts) for name, counts in _callbacks.items()}
+        datasets = {name: dict(dataset) for name, dataset in _datasets.items()}
+
+    lines = [
+        "# HELP dash_callback_seconds callback latency",
+        "# TYPE dash_callback_seconds histogram",
+    ]
+
+    for name, counts in callbacks.items():
+        total = 0
+        for bound, count in zip(BUCKETS + ("+Inf",), counts):
+            total += count
+            lines.append(
+                f'dash_callback_seconds_bucket{{callback="{name}",le="{bound}"}} {total}'
+            )
+
+        lines.append(f'dash_callback_seconds_sum{{callback="{name}"}} {counts[-3]}')
+        lines.append(f'dash_callback_seconds_count{{callback="{name}"}} {total}')
+
+    for metric, kind, column, description in (
+        ("dash_callback_response_bytes", "counter", -2, "uncompressed callback bytes"),
+        ("dash_callback_errors", "counter", -1, "callback error responses"),
+    ):
+        lines.append(f"# HELP {metric}_total {description}")
+        lines.append(f"# TYPE {metric}_total {kind}")
+
+        for name, counts in callbacks.items():
+            lines.append(f'{metric}_total{{callback="{name}"}} {counts[column]}')
+
+    for field, metric, description in (
+        ("version", "dataset_version", "dataset version served"),
+        ("rows", "dataset_rows", "dataset indicator rows"),
+        ("years", "dataset_years", "dataset year columns"),
+        ("bytes", "dataset_memory_bytes", "dataset values + labels in memory"),
+        ("parse_seconds", "dataset_parse_seconds", "last dataset parse time"),
+    ):
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} gauge")
+
+        for name, dataset in datasets.items():
+            if field in dataset:
+                lines.append(f'{metric}{{dataset="{name}"}} {dataset[field]}')
+
+    return "\n".join(lines) + "\n"
+
+
+def init_app(app, auth=None):
+    """
+    -> instrument a dash app's callbacks and add the `/metrics` route, if enabled
+    :param app: dash app
+    :param auth: dash_auth BasicAuth guarding the app, `/metrics` uses it too
+                 unless METRICS_PUBLIC=1
+    """
+
+    if not ENABLED:
+        return
+
+    server = app.server
+    updatePath = f"{app.config.routes_pathname_prefix}_dash-update-component"
+
+    @server.before_request
+    def start_timer():
+        flask.g.metricsStart = time.perf_counter()
+
+    # sized in the view: every after_request hook, Flask-Compress's included,
+    # runs after it, whatever order the hooks were registered in
+    dispatch = server.view_functions[updatePath]
+
+    @functools.wraps(dispatch)
+    def sized_dispatch(*args, **kwargs):
+        response = flask.make_response(dispatch(*args, **kwargs))
+        flask.g.metricsBytes = response.calculate_content_length() or 0
+        return response
+
+    server.view_functions[updatePath] = sized_dispatch
+
+    @server.after_request
+    def count_callback(response):
+        if flask.request.path == updatePath:
+            seconds = time.perf_counter() - flask.g.metricsStart
+
+            # dash already parsed the body, get_json() is cached
+            output = (flask.request.get_json(silent=True) or {}).get("output")
+            callback = app.callback_map.get(output, {}).get("callback")
+            name = getattr(callback, "__name__", output)
+
+            observe_callback(
+                name,
+                seconds,
+                flask.g.get("metricsBytes", 0),
+                response.status_code >= 400,
+            )
+
+        return response
+
+    def serve_metrics():
+        return flask.Response(render(), mimetype="text/plain; version=0.0.4")
+
+    if auth is not None and not PUBLIC:
+        serve_metrics = auth.auth_wrapper(serve_metrics)
+
+    server.add_url_rule("/metrics", "metrics", serve_metrics)
@@ -0,0 +1,186 @@
+"""
+BasicAuth over salted password hashes
+
+app_users keeps salted PBKDF2 hashes instead of passwords. checking one takes
+~100 ms of CPU on purpose, and dash_auth checks the Authorization header of
+every request, each callback included.
+
+here the hash is only checked on a client's first request. it gets a signed
+session cookie back, later requests are authorized by that cookie: looked up
+in an in-memory cache of verified credentials, else its signature is checked
+(constant time). clients that don't keep cookies (curl, load tests) are
+cached by a keyed digest of their Authorization header, so no password is
+kept in memory.
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import dash_auth
+import flask
+import itsdangerous
+from werkzeug.security import check_password_hash
+
+# signs session cookies, set the same one on every worker
+SECRET = os.environ.get("SESSION_SECRET") or os.urandom(32).hex()
+
+# lifetime of a session | cached credential, in seconds
+SESSION_SECONDS = int(float(os.environ.get("SESSION_HOURS", 12)) * 3600)
+
+COOKIE_NAME = "dash_session"
+
+# `1` | `0` | `auto`: the cookie is Secure when the request came over https,
+# directly or through a proxy setting X-Forwarded-Proto
+COOKIE_SECURE = os.environ.get("SESSION_COOKIE_SECURE", "auto").lower()
+
+# verified credentials kept in memory
+MAX_SESSIONS = 1024
+
+stats = {"hits": 0, "signature_checks": 0, "hash_checks": 0}
+
+
+def secure_cookie():
+    """
+    -> whether the session cookie of the current request is sent Secure
+    :return: bool
+    """
+
+    if COOKIE_SECURE in ("1", "0"):
+        return COOKIE_SECURE == "1"
+
+    # a flag only, trusting the header can't widen where the cookie goes
+    forwarded = flask.request.headers.get("X-Forwarded-Proto", "")
+
+    return flask.request.is_secure or forwarded.split(",")[0].strip() == "https"
+
+
+class BasicAuth(dash_auth.BasicAuth):
+    """
+    dash_auth.BasicAuth checking password hashes once per session
+    """
+
+    def __init__(self, app, username_hash_pairs):
+        """
+        :param app: dash app
+        :param username_hash_pairs: dict username -> werkzeug password hash
+        """
+
+        dash_auth.BasicAuth.__init__(self, app, username_hash_pairs)
+
+        self._signer = itsdangerous.TimestampSigner(SECRET, salt=COOKIE_NAME)
+
+        # keyed digest of a cookie | header -> (username, expiry), oldest first
+        self._verified = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _digest(self, credential):
+        return hmac.new(SECRET.encode(), credential.encode(), hashlib.sha256).digest()
+
+    def _user_tag(self, username):
+        # a changed password invalidates the sessions signed before it
+        return hashlib.blake2b(
+            self._users[username].encode(), digest_size=8
+        ).hexdigest()
+
+    def _cached(self, key):
+        with self._lock:
+            entry = self._verified.get(key)
+
+            if entry is None:
+                return None
+
+            if entry[1] < time.monotonic():
+                del self._verified[key]
+                return None
+
+            stats["hits"] += 1
+            self._verified.move_to_end(key)
+            return entry[0]
+
+    def _remember(self, key, username):
+        with self._lock:
+            self._verified[key] = (username, time.monotonic() + SESSION_SECONDS)
+
+            while len(self._verified) > MAX_SESSIONS:
+                self._verified.popitem(last=False)
+
+    def _session_user(self, token):
+        key = self._digest(token)
+        if self._cached(key) is not None:
+            return True
+
+        with self._lock:
+            stats["signature_checks"] += 1
+
+        try:
+            value = self._signer.unsign(token, max_age=SESSION_SECONDS).decode()
+
+        except itsdangerous.BadSignature:
+            return False
+
+        username, _, tag = value.rpartition(":")
+        if username not in self._users or not hmac.compare_digest(
+            tag, self._user_tag(username)
+        ):
+            return False
+
+        self._remember(key, username)
+        return True
+
+    def _header_user(self, header):
+        key = self._digest(header)
+        username = self._cached(key)
+        if username is not None:
+            return username
+
+        try:
+            credentials = base64.b64decode(header.split("Basic ")[1]).decode("utf-8")
+            username, password = credentials.split(":", 1)
+
+        except (IndexError, ValueError):
+            return None
+
+        passwordHash = self._users.get(username)
+        with self._lock:
+            stats["hash_checks"] += 1
+
+        if passwordHash is None or not check_password_hash(passwordHash, password):
+            return None
+
+        self._remember(key, username)
+        return username
+
+    def is_authorized(self):
+        token = flask.request.cookies.get(COOKIE_NAME)
+        if token and self._session_user(token):
+            return True
+
+        header = flask.request.headers.get("Authorization")
+        username = self._header_user(header) if header else None
+
+        if username is None:
+            return False
+
+        # the browser sends it back with every callback from now on
+        token = self._signer.sign(f"{username}:{self._user_tag(username)}").decode()
+        secure = secure_cookie()
+
+        @flask.after_this_request
+        def set_session_cookie(response):
+            response.set_cookie(
+                COOKIE_NAME,
+                token,
+                max_age=SESSION_SECONDS,
+                path=self.app.config.routes_pathname_prefix,
+                secure=secure,
+                httponly=True,
+                samesite="Lax",
+            )
+            return response
+
+        return True
@@ -0,0 +1,109 @@
+"""
+single-flight callbacks
+
+when many sessions fire the same deterministic callback with the same inputs
+at once (a dashboard shown to a room), only the first request computes it:
+the others wait for it and get the same serialized response. requests are
+only coalesced while one is in flight, nothing is cached afterwards.
+
+this helps threaded workers (gunicorn --threads), a sync worker handles one
+request at a time anyway.
+"""
+
+import functools
+import json
+import threading
+
+# key -> {"done": event, "result", "error"} of the call in flight
+_flights = {}
+_lock = threading.Lock()
+
+stats = {"leaders": 0, "followers": 0}
+
+
+def do(key, compute):
+    """
+    -> compute() once for concurrent calls with the same key
+    :param key: hashable, equal keys must give equal results
+    :param compute: callable
+    :return: compute()'s result, its exception is raised in every caller
+    """
+
+    with _lock:
+        flight = _flights.get(key)
+        leader = flight is None
+
+        if leader:
+            flight = _flights[key] = {
+                "done": threading.Event(),
+                "result": None,
+                "error": None,
+            }
+            stats["leaders"] += 1
+
+        else:
+            stats["followers"] += 1
+
+    if not leader:
+        flight["done"].wait()
+
+        if flight["error"] is not None:
+            raise flight["error"]
+
+        return flight["result"]
+
+    try:
+        flight["result"] = compute()
+
+    except BaseException as e:
+        flight["error"] = e
+        raise
+
+    finally:
+        with _lock:
+            del _flights[key]
+
+        flight["done"].set()
+
+    return flight["result"]
+
+
+def coalesce(app, pin, version):
+    """
+    -> decorator, placed above @app.callback: concurrent requests with the same
+       inputs | state and dataset version share one call and its serialized
+       response (dash's callback_map entry is replaced, the callback isn't)
+    -> the callback gets the snapshot its key was taken from as `view=`, a
+       version published in between can't be served under the older key
+    -> only for callbacks that don't read callback_context
+    :param app: dash app
+    :param pin: callable returning a snapshot of the data the callback reads
+    :param version: callable, the (hashable) version of a snapshot
+    """
+
+    def register(callback):
+        for entry in app.callback_map.values():
+            if entry.get("callback") is callback:
+                break
+
+        else:
+            raise ValueError(f"`{callback.__name__}` is not a registered callback")
+
+        def dispatch(*args, outputs_list):
+            view = pin()
+            key = (
+                callback.__name__,
+                version(view),
+                json.dumps([args, outputs_list], sort_keys=True),
+            )
+
+            return do(
+                key, lambda: callback(*args, outputs_list=outputs_list, view=view)
+            )
+
+        # metrics looks the callback up by its name
+        functools.update_wrapper(dispatch, callback)
+        entry["callback"] = dispatch
+        return callback
+
+    return register
@@ -0,0 +1,161 @@
+"""
+binary snapshots of the bundled datasets in data/ (and catalog files, see
+catalog.py)
+
+a parsed file is kept as a datastore frame (`.npy` + `.json`, memory-mapped on
+load) next to a record of the source file's mtime, size and hash. the file is
+parsed again only when it changed: mtime | size first, then its hash, so a
+fresh checkout with the same content still uses the snapshot.
+
+prebuild the snapshots with `python snapshot.py`
+"""
+
+import hashlib
+import json
+import os
+
+import datastore
+from utility import parse_data
+
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", os.path.join("data", ".snapshots"))
+
+BUNDLED = {
+    "ait": os.path.join("data", "ait.csv"),
+    "eco": os.path.join("data", "eco-ind.csv"),
+}
+
+
+def file_hash(path):
+    """
+    -> content hash of a file, read in chunks
+    :param path: file path
+    :return: str hex digest
+    """
+
+    digest = hashlib.blake2b(digest_size=20)
+
+    with open(path, "rb") as dataFile:
+        for chunk in iter(lambda: dataFile.read(1024 * 1024), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def _read_source(base):
+    try:
+        with open(f"{base}.source.json") as sourceFile:
+            return json.load(sourceFile)
+
+    except (OSError, ValueError):
+        return {}
+
+
+def _base(path):
+    # files with the same name in different directories get their own snapshot
+    pathHash = hashlib.blake2b(os.path.abspath(path).encode(), digest_size=4)
+    return os.path.join(
+        SNAPSHOT_DIR, f"{os.path.basename(path)}-{pathHash.hexdigest()}"
+    )
+
+
+def source_key(path):
+    """
+    -> content hash of a file, from its snapshot record while mtime | size are
+       unchanged
+    :param path: csv | xls(x) file path
+    :return: str hex digest, see file_hash
+    """
+
+    stat = os.stat(path)
+    source = _read_source(_base(path))
+
+    if (
+        source.get("hash")
+        and source.get("mtime_ns") == stat.st_mtime_ns
+        and source.get("size") == stat.st_size
+    ):
+        return source["hash"]
+
+    return file_hash(path)
+
+
+def seed(name, loader=None):
+    """
+    -> publish a bundled dataset to the store, unless the store already holds
+       one seeded from the same file content (uploads on top of it are kept)
+    :param name: key of BUNDLED
+    :param loader: callable returning the parsed file | None, default load
+    :return: int current version in the store
+    :raises ValueError: the file could not be processed, nothing is published
+    """
+
+    path = BUNDLED[name]
+    loader = loader or (lambda: load(path))
+
+    def parsed():
+        df = loader()
+
+        # parse_data printed why
+        if df is None:
+            raise ValueError(f"bundled file `{path}` could not be processed")
+
+        return df
+
+    return datastore.setdefault(name, parsed, source_key(path))
+
+
+def load(path):
+    """
+    -> parse_data of a bundled file, from its snapshot while the file is unchanged
+    :param path: csv | xls(x) file path
+    :return: pandas dataframe | None if the file could not be processed
+    """
+
+    base = _base(path)
+    stat = os.stat(path)
+    source = _read_source(base)
+    current = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+    try:
+        if all(source.get(field) == value for field, value in current.items()):
+            return datastore.map_frame(base)
+
+        current["hash"] = file_hash(path)
+
+        if source.get("hash") == current["hash"]:
+            df = datastore.map_frame(base)
+            _save_source(base, current)
+            return df
+
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] Error reading snapshot of `{path}`, parsing it. {e}")
+
+    df = parse_data(filename=path, isFileOnly=True)
+
+    if df is not None:
+        try:
+            current["hash"] = current.get("hash") or file_hash(path)
+
+            # the file hash keys its cached summary like an upload's content key
+            df.attrs["key"] = current["hash"]
+
+            os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+            datastore.save_frame(base, df, current["hash"])
+            _save_source(base, current)
+
+        except OSError as e:
+            print(f"[ERROR] Error writing snapshot of `{path}`. {e}")
+
+    return df
+
+
+def _save_source(base, source):
+    datastore.write_atomic(
+        f"{base}.source.json", lambda f: f.write(json.dumps(source).encode())
+    )
+
+
+if __name__ == "__main__":
+    for name, path in BUNDLED.items():
+        df = load(path)
+        print(f"[+] {name}: `{path}` {None if df is None else df.shape}")
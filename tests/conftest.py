@@ -0,0 +1,20 @@
+"""
+the app's modules are flat top-level modules reading their config from the
+environment at import: point every store | cache at a scratch directory
+before any of them is imported, and run from the repository root, where the
+bundled `data/` files are
+"""
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_scratch = tempfile.mkdtemp(prefix="dashdashboard-tests-")
+os.environ.setdefault("DATASTORE_DIR", os.path.join(_scratch, "store"))
+os.environ.setdefault("SNAPSHOT_DIR", os.path.join(_scratch, "snapshots"))
+os.environ.setdefault("UPLOAD_WORKERS", "0")
+
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
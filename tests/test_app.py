@@ -0,0 +1,121 @@
+import base64
+import os
+import shutil
+import subprocess
+import sys
+
+from conftest import ROOT
+
+# prints GDP 1980 of the eco dataset a fresh worker serves
+SERVED_GDP = """
+import app
+print(app.currentDatasets().dfEco.iloc[0][1980])
+"""
+
+
+def serve(workDir, env):
+    result = subprocess.run(
+        [sys.executable, "-c", SERVED_GDP],
+        cwd=workDir,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    assert result.returncode == 0, result.stderr
+
+    return float(result.stdout.split()[-1])
+
+
+def test_edited_bundled_file_is_served_after_restart(tmp_path):
+    shutil.copytree(os.path.join(ROOT, "data"), tmp_path / "data")
+    env = dict(
+        os.environ,
+        PYTHONPATH=ROOT,
+        # outlives the restart, like the default store in the temp directory
+        DATASTORE_DIR=str(tmp_path / "store"),
+        SNAPSHOT_DIR=str(tmp_path / "snapshots"),
+        DATA_DIR=str(tmp_path / "data"),
+    )
+
+    assert serve(tmp_path, env) == 3441
+
+    path = tmp_path / "data" / "eco-ind.csv"
+    path.write_text(path.read_text().replace('"3,441"', '"9,999"', 1))
+
+    assert serve(tmp_path, env) == 9999
+    # unchanged file: the store's version is kept, not published again
+    assert serve(tmp_path, env) == 9999
+    assert (tmp_path / "store" / "eco.version").read_text() == "2"
+
+
+def callback(client, output, inputs, changed, state=()):
+    body = {
+        "output": output,
+        "inputs": [
+            {"id": componentId, "property": prop, "value": value}
+            for componentId, prop, value in inputs
+        ],
+        "state": [
+            {"id": componentId, "property": prop, "value": value}
+            for componentId, prop, value in state
+        ],
+        "changedPropIds": [changed],
+    }
+
+    return client.post("/_dash-update-component", json=body, headers=AUTH)
+
+
+AUTH = {"Authorization": "Basic " + base64.b64encode(b"user1:test1").decode()}
+
+
+def test_unknown_dataset_falls_back_to_the_shared_one():
+    import app
+
+    client = app.server.test_client()
+    summaryOutput = next(
+        output for output in app.app.callback_map if "summary-year-value" in output
+    )
+
+    def summary(datasetId):
+        response = callback(
+            client,
+            summaryOutput,
+            [
+                ("summary-year-filter", "value", 1990),
+                ("eco-version", "data", None),
+                ("eco-dataset", "value", datasetId),
+            ],
+            "eco-dataset.value",
+        )
+        assert response.status_code == 200
+
+        return response.get_json()["response"]
+
+    assert summary("missing.csv") == summary("eco")
+
+    response = callback(
+        client,
+        "..btei-data.data...ait-upload-status.children...ait-upload-poll.disabled..",
+        [
+            ("ait-upload-poll", "n_intervals", None),
+            ("ait-upload-job", "data", None),
+            ("ait-dataset", "value", "missing.csv"),
+        ],
+        "ait-dataset.value",
+    )
+    assert response.status_code == 200
+
+    response = callback(
+        client,
+        "..eco-version.data...summary-year-filter.options...summary-year-filter.value"
+        "...ei-upload-status.children...ei-upload-poll.disabled..",
+        [
+            ("ei-upload-poll", "n_intervals", None),
+            ("ei-upload-job", "data", None),
+            ("eco-dataset", "value", "missing.csv"),
+        ],
+        "eco-dataset.value",
+        [("summary-year-filter", "value", 1990)],
+    )
+    assert response.status_code == 200
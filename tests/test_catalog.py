@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+import catalog
+import datastore
+
+
+@pytest.fixture
+def dataDir(tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog, "INDEX_PATH", str(tmp_path / "catalog.json"))
+    monkeypatch.setattr(catalog, "_index", {})
+    monkeypatch.setattr(catalog, "_loaded", catalog.OrderedDict())
+
+    data = tmp_path / "data"
+    data.mkdir()
+    (data / "zw.csv").write_text('Year,2019,2020\nGDP,"3,441",2.5\n')
+
+    return data
+
+
+def test_scan_indexes_files(dataDir):
+    index = catalog.scan(str(dataDir))
+
+    assert list(index) == ["zw.csv"]
+    assert index["zw.csv"]["kind"] == "eco"
+    assert index["zw.csv"]["years"] == 2
+    assert catalog.options("eco")[0]["value"] == "zw.csv"
+
+
+def test_scan_writes_index_only_when_changed(dataDir, monkeypatch):
+    writes = []
+    writeAtomic = datastore.write_atomic
+
+    def counted(path, write):
+        writes.append(path)
+        writeAtomic(path, write)
+
+    monkeypatch.setattr(datastore, "write_atomic", counted)
+
+    catalog.scan(str(dataDir))
+    catalog.scan(str(dataDir))
+    assert writes == [catalog.INDEX_PATH]
+
+    (dataDir / "zw2.csv").write_text("Year,2019\nGDP,1\n")
+    catalog.scan(str(dataDir))
+    assert writes == [catalog.INDEX_PATH] * 2
+
+
+def test_load_unknown_dataset(dataDir):
+    catalog.scan(str(dataDir))
+
+    with pytest.raises(ValueError):
+        catalog.load("missing.csv")
+
+
+def test_load_removed_file(dataDir):
+    catalog.scan(str(dataDir))
+    os.remove(dataDir / "zw.csv")
+
+    with pytest.raises(OSError):
+        catalog.load("zw.csv")
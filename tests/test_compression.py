@@ -0,0 +1,98 @@
+import gzip
+
+import dash
+import dash_html_components as html
+import pytest
+
+import compression
+
+CSS = "".join(f".row-{n} {{ margin: {n}px; }}\n" for n in range(200))
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("", "identity"),
+        ("gzip", "gzip"),
+        ("gzip, br", "br"),
+        ("GZIP;q=0.5", "gzip"),
+        ("br;q=0, gzip", "gzip"),
+        ("br;q=0.0, gzip; q=0.000", "identity"),
+        ("br; q=0.1", "br"),
+        ("*", "br"),
+        ("*;q=0", "identity"),
+        ("*, br;q=0", "gzip"),
+        ("*;q=0, gzip", "gzip"),
+        ("identity", "identity"),
+        ("br;q=x, gzip", "gzip"),
+    ],
+)
+def test_accepted_encoding(header, expected):
+    bodies = {"identity": b"a", "gzip": b"b", "br": b"c"}
+
+    assert compression.accepted_encoding(header, bodies) == expected
+
+
+def test_accepted_encoding_without_brotli():
+    bodies = {"identity": b"a", "gzip": b"b"}
+
+    assert compression.accepted_encoding("br, *", bodies) == "gzip"
+    assert compression.accepted_encoding("br", bodies) == "identity"
+
+
+@pytest.fixture
+def server(tmp_path):
+    (tmp_path / "style.css").write_text(CSS)
+
+    app = dash.Dash(__name__, assets_folder=str(tmp_path), compress=False)
+    app.layout = html.Div()
+    compression.init_app(app)
+
+    return app.server
+
+
+@pytest.fixture
+def client(server):
+    return server.test_client()
+
+
+def flask_response(server, path, headers):
+    # the response as the app returns it, werkzeug drops some 304 headers later
+    with server.test_request_context(path, headers=headers):
+        return server.full_dispatch_request()
+
+
+def test_static_file_is_compressed_with_etag(client):
+    response = client.get("/assets/style.css?m=1", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert "immutable" in response.headers["Cache-Control"]
+    assert response.headers["ETag"].endswith('-gzip"')
+    assert gzip.decompress(response.data).decode() == CSS
+
+
+def test_static_file_revalidates_with_bodyless_304(server, client):
+    etag = client.get("/assets/style.css?m=1").headers["ETag"]
+
+    response = flask_response(server, "/assets/style.css?m=1", {"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.get_data() == b""
+    assert sorted(response.headers.keys()) == ["Cache-Control", "ETag", "Vary"]
+    assert response.headers["ETag"] == etag
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert "immutable" in response.headers["Cache-Control"]
+
+
+def test_etag_of_another_encoding_is_not_a_match(client):
+    etag = client.get("/assets/style.css?m=1").headers["ETag"]
+
+    response = client.get(
+        "/assets/style.css?m=1",
+        headers={"If-None-Match": etag, "Accept-Encoding": "gzip"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
@@ -0,0 +1,128 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import datastore
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(datastore, "STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(datastore, "_mapped", {})
+    return tmp_path
+
+
+def frame(value, years=(2019, 2020)):
+    return pd.DataFrame(
+        [[value, value + 1.0], [value * 2, np.nan]],
+        index=pd.Index(["GDP", "Imports"], name="Year"),
+        columns=pd.Index(list(years)),
+    )
+
+
+def test_publish_then_map():
+    version = datastore.publish("eco", frame(1.0), key="k1")
+
+    assert version == 1
+    assert datastore.current_version("eco") == 1
+
+    loaded, df = datastore.load("eco")
+    assert loaded == 1
+    pd.testing.assert_frame_equal(df, frame(1.0))
+    assert df.attrs["key"] == "k1"
+    # memory-mapped, read only
+    assert not df.to_numpy().flags.writeable
+
+
+def test_load_remaps_newer_version():
+    datastore.publish("eco", frame(1.0))
+    assert datastore.load("eco")[1].iloc[0, 0] == 1.0
+
+    datastore.publish("eco", frame(5.0))
+    version, df = datastore.load("eco")
+
+    assert version == 2
+    assert df.iloc[0, 0] == 5.0
+
+
+def test_publish_prunes_old_versions(store):
+    for value in range(1, 6):
+        datastore.publish("eco", frame(float(value)))
+
+    kept = sorted(name for name in os.listdir(store) if name.endswith(".npy"))
+
+    assert kept == [
+        f"eco-{version}.npy" for version in range(6 - datastore.KEEP_VERSIONS, 6)
+    ]
+    assert datastore.load("eco")[1].iloc[0, 0] == 5.0
+
+
+def test_update_merges_under_the_lock():
+    datastore.publish("eco", frame(1.0))
+
+    def merge(df):
+        return df * 10, "merged", {"years": [2020], "blocks": []}
+
+    version = datastore.update("eco", merge)
+    df = datastore.load("eco")[1]
+
+    assert version == 2
+    assert df.iloc[0, 0] == 10.0
+    assert df.attrs["changed"] == {"years": [2020], "blocks": [], "base": 1}
+
+
+def test_update_without_dataset():
+    with pytest.raises(ValueError):
+        datastore.update("eco", lambda df: (df, None, {}))
+
+
+def test_concurrent_setdefault_loads_once():
+    calls = []
+    barrier = threading.Barrier(8)
+    versions = []
+
+    def loader():
+        calls.append(1)
+        return frame(1.0)
+
+    def boot():
+        barrier.wait()
+        versions.append(datastore.setdefault("eco", loader, "hash-1"))
+
+    threads = [threading.Thread(target=boot) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert versions == [1] * 8
+
+
+def test_setdefault_keeps_uploads_while_source_unchanged():
+    datastore.setdefault("eco", lambda: frame(1.0), "hash-1")
+    datastore.publish("eco", frame(7.0), key="upload")
+
+    assert datastore.setdefault("eco", lambda: frame(1.0), "hash-1") == 2
+    assert datastore.load("eco")[1].iloc[0, 0] == 7.0
+
+
+def test_setdefault_republishes_changed_source():
+    datastore.setdefault("eco", lambda: frame(1.0), "hash-1")
+
+    version = datastore.setdefault("eco", lambda: frame(9999.0), "hash-2")
+
+    assert version == 2
+    assert datastore.current_source("eco") == "hash-2"
+    assert datastore.load("eco")[1].iloc[0, 0] == 9999.0
+
+
+def test_setdefault_republishes_store_without_source():
+    # stores written before sources were recorded
+    datastore.publish("eco", frame(1.0))
+
+    assert datastore.setdefault("eco", lambda: frame(2.0), "hash-1") == 2
+    assert datastore.current_source("eco") == "hash-1"
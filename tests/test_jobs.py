@@ -0,0 +1,128 @@
+import base64
+import os
+
+import pytest
+
+import datastore
+import jobs
+import upload_cache
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(datastore, "STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(datastore, "_mapped", {})
+    monkeypatch.setattr(jobs, "JOBS_DIR", str(tmp_path / "jobs"))
+    monkeypatch.setattr(jobs, "MAX_WORKERS", 0)
+    monkeypatch.setattr(upload_cache, "CACHE_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(upload_cache, "_entries", upload_cache.OrderedDict())
+    return tmp_path
+
+
+def upload(text, contentType="text/csv"):
+    return f"data:{contentType};base64," + base64.b64encode(text.encode()).decode()
+
+
+CSV = "Year,2019,2020\nGDP,100,110\nImports,40,-4\n"
+
+
+@pytest.mark.parametrize(
+    "jobId", [None, 42, "", "../" + "a" * 29, "a" * 31, "a" * 33, "A" * 32, "g" * 32]
+)
+def test_status_rejects_bad_ids(jobId):
+    assert jobs.status(jobId) == {"state": "unknown"}
+
+
+def test_status_unknown_job():
+    assert jobs.status("a" * 32) == {"state": "unknown"}
+
+
+def test_submit_runs_to_done(store):
+    jobId = jobs.submit("sheet", "sheet.csv", upload(CSV))
+
+    status = jobs.status(jobId)
+    assert status["state"] == "done"
+    assert status["version"] == 1
+    assert status["filename"] == "sheet.csv"
+
+    version, df = datastore.load("sheet")
+    assert version == 1
+    assert df.loc["Imports", 2020] == -4
+    # the spool file is gone, only the status is left
+    assert os.listdir(store / "jobs") == [f"{jobId}.json"]
+
+
+def test_submit_reports_unparsable_file(store):
+    jobId = jobs.submit("sheet", "sheet.csv", upload("not,a\nsheet\n"))
+
+    assert jobs.status(jobId)["state"] == "failed"
+    assert datastore.current_version("sheet") is None
+    assert os.listdir(store / "jobs") == [f"{jobId}.json"]
+
+
+def test_submit_reports_bad_upload(store):
+    jobId = jobs.submit("sheet", "sheet.csv", "not an upload")
+
+    assert jobs.status(jobId)["state"] == "failed"
+    assert os.listdir(store / "jobs") == [f"{jobId}.json"]
+
+
+def test_status_lifecycle(monkeypatch):
+    states = []
+    setStatus = jobs._set_status
+
+    def record(jobId, **status):
+        states.append(status["state"])
+        setStatus(jobId, **status)
+
+    monkeypatch.setattr(jobs, "_set_status", record)
+    jobs.submit("sheet", "sheet.csv", upload(CSV))
+
+    assert states == ["queued", "running", "done"]
+
+
+def test_pool_gets_a_path_not_the_contents(monkeypatch, store):
+    submitted = []
+
+    class Future:
+        def add_done_callback(self, callback):
+            pass
+
+    class Executor:
+        def submit(self, *args):
+            submitted.append(args)
+            return Future()
+
+    monkeypatch.setattr(jobs, "MAX_WORKERS", 1)
+    monkeypatch.setattr(jobs, "_executor", lambda: Executor())
+
+    contents = upload(CSV)
+    jobId = jobs.submit("sheet", "sheet.csv", contents)
+
+    [(function, *args)] = submitted
+    assert function is jobs.run
+    assert contents not in args
+    assert jobs.status(jobId)["state"] == "queued"
+
+    with open(store / "jobs" / f"{jobId}.upload") as f:
+        assert f.read() == CSV
+
+    # what the pool process does
+    function(*args)
+    assert jobs.status(jobId)["state"] == "done"
+    assert not os.path.exists(store / "jobs" / f"{jobId}.upload")
+
+
+def test_prune_keeps_newest_statuses(monkeypatch, store):
+    monkeypatch.setattr(jobs, "MAX_JOBS", 2)
+
+    jobIds = []
+    for n in range(4):
+        jobIds.append(jobs.submit("sheet", "sheet.csv", upload(CSV)))
+        # statuses written within the same clock tick would tie
+        os.utime(store / "jobs" / f"{jobIds[-1]}.json", (n, n))
+
+    # pruned before each submit, the newest one comes on top
+    assert sorted(os.listdir(store / "jobs")) == sorted(
+        f"{jobId}.json" for jobId in jobIds[1:]
+    )
@@ -0,0 +1,57 @@
+import threading
+
+import dash
+import dash_html_components as html
+import pytest
+
+import layout_cache
+
+
+@pytest.fixture(autouse=True)
+def stats(monkeypatch):
+    monkeypatch.setattr(layout_cache, "_cached", None)
+    for name in layout_cache.stats:
+        monkeypatch.setitem(layout_cache.stats, name, 0)
+    return layout_cache.stats
+
+
+@pytest.fixture
+def client():
+    app = dash.Dash(__name__)
+    app.layout = html.Div("summary " * 200, id="page")
+    layout_cache.init_app(app, lambda: 1)
+    return app.server.test_client()
+
+
+def test_layout_served_then_revalidated(client, stats):
+    response = client.get("/_dash-layout", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+
+    etag = response.headers["ETag"]
+    response = client.get(
+        "/_dash-layout", headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.data == b""
+
+    assert stats == {"hits": 1, "misses": 1, "not_modified": 1}
+
+
+def test_concurrent_hits_are_all_counted(stats):
+    app = dash.Dash(__name__)
+    app.layout = html.Div()
+    layout_cache._layout(app, 1)
+
+    def serve():
+        for _ in range(500):
+            layout_cache._layout(app, 1)
+
+    threads = [threading.Thread(target=serve) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert stats["hits"] == 8 * 500
+    assert stats["misses"] == 1
@@ -0,0 +1,69 @@
+import gzip
+import json
+
+import dash
+import dash_html_components as html
+import pytest
+from dash.dependencies import Input, Output
+
+import compression
+import metrics
+
+BODY = "indicator " * 500
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    monkeypatch.setattr(metrics, "_callbacks", {})
+
+    app = dash.Dash(__name__, compress=False)
+    app.layout = html.Div([html.Div(id="in"), html.Div(id="out")])
+
+    @app.callback(Output("out", "children"), Input("in", "children"))
+    def show(value):
+        return BODY
+
+    # the order app.py uses: metrics' after_request hook runs after compression's
+    metrics.init_app(app)
+    compression.init_app(app)
+
+    return app.server.test_client()
+
+
+def update(client):
+    return client.post(
+        "/_dash-update-component",
+        json={
+            "output": "out.children",
+            "outputs": {"id": "out", "property": "children"},
+            "inputs": [{"id": "in", "property": "children", "value": None}],
+            "changedPropIds": ["in.children"],
+        },
+        headers={"Accept-Encoding": "gzip"},
+    )
+
+
+def test_response_bytes_are_counted_before_compression(client):
+    response = update(client)
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    body = gzip.decompress(response.data)
+    assert json.loads(body)["response"]["out"]["children"] == BODY
+
+    counts = metrics._callbacks["show"]
+    assert counts[-2] == len(body) > len(response.data)
+    assert counts[-1] == 0
+    assert sum(counts[: len(metrics.BUCKETS) + 1]) == 1
+
+
+def test_render(client):
+    update(client)
+    update(client)
+
+    text = metrics.render()
+
+    assert 'dash_callback_seconds_count{callback="show"} 2' in text
+    assert 'dash_callback_errors_total{callback="show"} 0' in text
+    assert "# HELP dash_callback_response_bytes_total uncompressed" in text
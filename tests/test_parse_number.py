@@ -0,0 +1,39 @@
+import doctest
+
+import numpy as np
+import pandas as pd
+
+import parse_number
+from parse_number import parseNumber, parseNumberArray
+
+
+def test_doctests():
+    failures, tests = doctest.testmod(parse_number)
+
+    assert tests and not failures
+
+
+def test_array_matches_scalar_on_object_inputs():
+    columns = [
+        [1, 2],
+        pd.Series([1.0, 2.0], dtype=object),
+        [1.5, None],
+        np.array(["1.234,5", 7, None, "n/a"], dtype=object),
+        pd.Series(["40%", "-4", 2.5], index=["a", "b", "c"]),
+    ]
+
+    for column in columns:
+        expected = [
+            np.nan if number is None else number for number in map(parseNumber, column)
+        ]
+
+        np.testing.assert_array_equal(parseNumberArray(column), expected)
+
+
+def test_numeric_arrays_are_copied():
+    values = np.array([1, 2])
+    parsed = parseNumberArray(values)
+    parsed[0] = 5
+
+    assert parsed.dtype == np.float64
+    assert values[0] == 1
@@ -0,0 +1,175 @@
+import base64
+import time
+
+import dash
+import dash_html_components as html
+import itsdangerous
+import pytest
+from werkzeug.security import generate_password_hash
+
+import session_auth
+
+PASSWORD_HASHES = {"analyst": generate_password_hash("s3cret")}
+
+
+def basic(credentials):
+    return {"Authorization": "Basic " + base64.b64encode(credentials.encode()).decode()}
+
+
+@pytest.fixture(autouse=True)
+def stats(monkeypatch):
+    monkeypatch.setattr(session_auth, "COOKIE_SECURE", "auto")
+    for name in session_auth.stats:
+        monkeypatch.setitem(session_auth.stats, name, 0)
+    return session_auth.stats
+
+
+@pytest.fixture
+def auth():
+    app = dash.Dash(__name__)
+    app.layout = html.Div()
+    return session_auth.BasicAuth(app, dict(PASSWORD_HASHES))
+
+
+@pytest.fixture
+def client(auth):
+    return auth.app.server.test_client()
+
+
+def session_cookie(response):
+    [cookie] = [
+        header
+        for header in response.headers.getlist("Set-Cookie")
+        if header.startswith(f"{session_auth.COOKIE_NAME}=")
+    ]
+    return cookie
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        {},
+        basic("analyst:wrong"),
+        basic("nobody:s3cret"),
+        basic("analyst"),
+        {"Authorization": "Basic not-base64!"},
+        {"Authorization": "Bearer token"},
+    ],
+)
+def test_rejects_bad_credentials(client, headers):
+    response = client.get("/", headers=headers)
+
+    assert response.status_code == 401
+    assert "Set-Cookie" not in response.headers
+
+
+def test_password_checked_once_then_cookie(client, stats):
+    response = client.get("/", headers=basic("analyst:s3cret"))
+
+    assert response.status_code == 200
+    cookie = session_cookie(response)
+    assert "HttpOnly" in cookie
+    assert "SameSite=Lax" in cookie
+    assert "Secure" not in cookie
+    assert stats["hash_checks"] == 1
+
+    # the test client sends the cookie back, no header needed
+    for _ in range(3):
+        assert client.get("/").status_code == 200
+
+    # the first one checks the signature, the cookie is cached from then on
+    assert stats["hash_checks"] == 1
+    assert stats["signature_checks"] == 1
+    assert stats["hits"] == 2
+
+
+def test_cookie_signature_checked_by_another_worker(auth, client, stats):
+    client.get("/", headers=basic("analyst:s3cret"))
+
+    # a worker that never saw the login, same secret
+    other = session_auth.BasicAuth(auth.app, dict(PASSWORD_HASHES))
+    auth.is_authorized = other.is_authorized
+
+    assert client.get("/").status_code == 200
+    assert stats["signature_checks"] == 1
+    assert stats["hash_checks"] == 1
+
+
+def test_forged_cookie_rejected(client):
+    client.set_cookie("localhost", session_auth.COOKIE_NAME, "analyst:tag.forged")
+
+    assert client.get("/").status_code == 401
+
+
+def test_expired_cookie_rejected(auth, client):
+    class OldSigner(itsdangerous.TimestampSigner):
+        def get_timestamp(self):
+            return int(time.time()) - session_auth.SESSION_SECONDS - 60
+
+    signer = OldSigner(session_auth.SECRET, salt=session_auth.COOKIE_NAME)
+    token = signer.sign(f"analyst:{auth._user_tag('analyst')}").decode()
+    client.set_cookie("localhost", session_auth.COOKIE_NAME, token)
+
+    assert client.get("/").status_code == 401
+
+
+def test_changed_password_ends_sessions(auth, client):
+    client.get("/", headers=basic("analyst:s3cret"))
+    auth._verified.clear()
+
+    auth._users["analyst"] = generate_password_hash("n3w")
+
+    assert client.get("/").status_code == 401
+
+
+def test_header_clients_are_cached_without_the_password(auth, stats):
+    client = auth.app.server.test_client(use_cookies=False)
+
+    for _ in range(3):
+        assert client.get("/", headers=basic("analyst:s3cret")).status_code == 200
+
+    assert stats["hash_checks"] == 1
+    assert stats["hits"] == 2
+    assert all(b"s3cret" not in key for key in auth._verified)
+
+
+def test_cached_credentials_expire(auth, monkeypatch, stats):
+    client = auth.app.server.test_client(use_cookies=False)
+    monkeypatch.setattr(session_auth, "SESSION_SECONDS", -1)
+
+    for _ in range(2):
+        assert client.get("/", headers=basic("analyst:s3cret")).status_code == 200
+
+    assert stats["hash_checks"] == 2
+    assert stats["hits"] == 0
+
+
+def test_cached_credentials_are_bounded(auth, monkeypatch):
+    monkeypatch.setattr(session_auth, "MAX_SESSIONS", 2)
+
+    for n in range(4):
+        auth._remember(bytes([n]), "analyst")
+
+    assert list(auth._verified) == [bytes([2]), bytes([3])]
+
+
+@pytest.mark.parametrize(
+    "setting, baseUrl, headers, secure",
+    [
+        ("auto", "http://localhost", {}, False),
+        ("auto", "https://localhost", {}, True),
+        ("auto", "http://localhost", {"X-Forwarded-Proto": "https"}, True),
+        ("auto", "http://localhost", {"X-Forwarded-Proto": "http"}, False),
+        ("1", "http://localhost", {}, True),
+        ("0", "https://localhost", {}, False),
+    ],
+)
+def test_secure_cookie(client, monkeypatch, setting, baseUrl, headers, secure):
+    monkeypatch.setattr(session_auth, "COOKIE_SECURE", setting)
+
+    response = client.get(
+        "/", base_url=baseUrl, headers={**basic("analyst:s3cret"), **headers}
+    )
+
+    assert response.status_code == 200
+    assert ("Secure" in session_cookie(response)) == secure
@@ -0,0 +1,152 @@
+import threading
+import time
+
+import dash
+import dash_html_components as html
+import pytest
+from dash.dependencies import Input, Output
+
+import single_flight
+
+CALLERS = 8
+
+
+@pytest.fixture(autouse=True)
+def stats(monkeypatch):
+    for name in single_flight.stats:
+        monkeypatch.setitem(single_flight.stats, name, 0)
+    return single_flight.stats
+
+
+def wait_for_followers(stats, count):
+    deadline = time.monotonic() + 10
+    while stats["followers"] < count:
+        assert time.monotonic() < deadline, "followers never joined"
+        time.sleep(0.001)
+
+
+def call_concurrently(function):
+    """
+    -> run function in CALLERS threads, the first one (the leader) is held in
+       compute until every other has joined its flight
+    :return: list of (result, error) per thread
+    """
+
+    outcomes = [None] * CALLERS
+
+    def caller(n):
+        try:
+            outcomes[n] = (function(), None)
+
+        except Exception as e:
+            outcomes[n] = (None, e)
+
+    threads = [threading.Thread(target=caller, args=(n,)) for n in range(CALLERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    return outcomes
+
+
+def test_followers_get_the_leaders_result(stats):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        wait_for_followers(stats, CALLERS - 1)
+        return object()
+
+    outcomes = call_concurrently(lambda: single_flight.do("key", compute))
+
+    assert len(calls) == 1
+    assert {id(result) for result, error in outcomes} == {id(outcomes[0][0])}
+    assert stats == {"leaders": 1, "followers": CALLERS - 1}
+    assert not single_flight._flights
+
+
+def test_errors_reach_every_caller(stats):
+    def compute():
+        wait_for_followers(stats, CALLERS - 1)
+        raise KeyError("broken")
+
+    outcomes = call_concurrently(lambda: single_flight.do("key", compute))
+
+    errors = {id(error) for result, error in outcomes}
+    assert len(errors) == 1
+    assert isinstance(outcomes[0][1], KeyError)
+    assert not single_flight._flights
+
+    # nothing is kept, the next call computes again
+    assert single_flight.do("key", lambda: 42) == 42
+
+
+def test_different_keys_are_not_coalesced():
+    assert single_flight.do("a", lambda: 1) == 1
+    assert single_flight.do("b", lambda: 2) == 2
+
+
+class View:
+    def __init__(self, version):
+        self.version = version
+
+
+@pytest.fixture
+def app():
+    app = dash.Dash(__name__)
+    app.layout = html.Div([html.Div(id="in"), html.Div(id="out")])
+    return app
+
+
+def dispatch(app, value):
+    return app.callback_map["out.children"]["callback"](
+        value, outputs_list={"id": "out", "property": "children"}
+    )
+
+
+def test_coalesce_keys_by_the_view_the_callback_gets(app, monkeypatch):
+    views = iter([View(1), View(2)])
+    seen = []
+
+    @single_flight.coalesce(app, lambda: next(views), lambda view: view.version)
+    @app.callback(Output("out", "children"), Input("in", "children"))
+    def show(value, view):
+        seen.append(view)
+        return f"{value} v{view.version}"
+
+    keys = []
+    do = single_flight.do
+
+    def record(key, compute):
+        keys.append(key[1])
+        return do(key, compute)
+
+    monkeypatch.setattr(single_flight, "do", record)
+    first, second = dispatch(app, "x"), dispatch(app, "x")
+
+    assert [view.version for view in seen] == keys == [1, 2]
+    assert '"x v1"' in first
+    assert '"x v2"' in second
+
+
+def test_coalesced_callback_runs_once(app, stats):
+    calls = []
+
+    @single_flight.coalesce(app, lambda: View(1), lambda view: view.version)
+    @app.callback(Output("out", "children"), Input("in", "children"))
+    def show(value, view):
+        calls.append(1)
+        wait_for_followers(stats, CALLERS - 1)
+        return value
+
+    outcomes = call_concurrently(lambda: dispatch(app, "x"))
+
+    assert len(calls) == 1
+    assert len({result for result, error in outcomes}) == 1
+    assert all(error is None for result, error in outcomes)
+
+
+def test_coalesce_needs_a_registered_callback(app):
+    with pytest.raises(ValueError):
+        single_flight.coalesce(app, lambda: View(1), lambda view: view.version)(print)
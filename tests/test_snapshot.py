@@ -0,0 +1,50 @@
+import os
+import shutil
+
+import pytest
+
+import datastore
+import snapshot
+from conftest import ROOT
+
+
+@pytest.fixture(autouse=True)
+def bundled(tmp_path, monkeypatch):
+    monkeypatch.setattr(datastore, "STORE_DIR", str(tmp_path / "store"))
+    monkeypatch.setattr(datastore, "_mapped", {})
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+
+    path = tmp_path / "eco-ind.csv"
+    shutil.copy(os.path.join(ROOT, "data", "eco-ind.csv"), path)
+    monkeypatch.setitem(snapshot.BUNDLED, "eco", str(path))
+    return path
+
+
+def test_seed_then_load_snapshot(bundled):
+    assert snapshot.seed("eco") == 1
+    assert snapshot.seed("eco") == 1
+
+    version, df = datastore.load("eco")
+    assert df.iloc[0][1980] == 3441
+    assert df.attrs["key"] == snapshot.file_hash(bundled)
+
+
+@pytest.mark.parametrize("contents", [b"not,a\nsheet\n", b"\x00\xff" * 64])
+def test_seed_from_corrupt_bundled_file(bundled, contents):
+    bundled.write_bytes(contents)
+
+    with pytest.raises(ValueError, match="eco-ind.csv"):
+        snapshot.seed("eco")
+
+    assert datastore.current_version("eco") is None
+
+    # nothing left locked | half published: the fixed file seeds
+    shutil.copy(os.path.join(ROOT, "data", "eco-ind.csv"), bundled)
+    assert snapshot.seed("eco") == 1
+
+
+def test_seed_with_failing_loader():
+    with pytest.raises(ValueError, match="could not be processed"):
+        snapshot.seed("eco", lambda: None)
+
+    assert datastore.current_version("eco") is None
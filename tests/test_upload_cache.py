@@ -0,0 +1,78 @@
+import base64
+import threading
+
+import pytest
+
+import datastore
+import upload_cache
+
+CSV = "Year,2019,2020\nGDP,100,110\nImports,40,-4\n"
+
+
+def upload(text):
+    return "data:text/csv;base64," + base64.b64encode(text.encode()).decode()
+
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(datastore, "STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(datastore, "_mapped", {})
+    monkeypatch.setattr(upload_cache, "CACHE_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(upload_cache, "_entries", upload_cache.OrderedDict())
+    for name in upload_cache.stats:
+        monkeypatch.setitem(upload_cache.stats, name, 0)
+    return tmp_path
+
+
+def test_parse_upload_then_memory_then_disk(monkeypatch):
+    key, df = upload_cache.parse_upload("sheet.csv", upload(CSV))
+
+    assert df.loc["Imports", 2020] == -4
+    assert upload_cache.stats == {"hits": 0, "disk_hits": 0, "misses": 1}
+
+    assert upload_cache.parse_upload("sheet.csv", upload(CSV))[1] is df
+    assert upload_cache.stats["hits"] == 1
+
+    # a restarted worker: nothing in memory
+    monkeypatch.setattr(upload_cache, "_entries", upload_cache.OrderedDict())
+    key, cached = upload_cache.parse_upload("sheet.csv", upload(CSV))
+    assert cached.loc["Imports", 2020] == -4
+    assert upload_cache.stats == {"hits": 1, "disk_hits": 1, "misses": 1}
+
+
+def test_same_bytes_as_another_type_is_another_key():
+    assert upload_cache.content_key("a.csv", upload(CSV)) != upload_cache.content_key(
+        "a.xlsx", upload(CSV)
+    )
+
+
+def test_legacy_and_new_excel_are_other_keys():
+    assert upload_cache.content_key("a.xls", upload(CSV)) != upload_cache.content_key(
+        "a.xlsx", upload(CSV)
+    )
+
+
+def test_unsupported_file_is_rejected_like_parse_data():
+    assert upload_cache.parse_upload("data.csv", upload(CSV))[1] is not None
+
+    # same bytes: parse_data would reject the name, so must the cache
+    assert upload_cache.parse_upload("data.txt", upload(CSV)) == (None, None)
+    assert upload_cache.stats["hits"] == 0
+
+    with pytest.raises(ValueError, match="expected a .csv"):
+        upload_cache.content_key("data.txt", upload(CSV))
+
+
+def test_concurrent_misses_are_all_counted():
+    threads = [
+        threading.Thread(
+            target=lambda: [upload_cache.get(f"missing-{n}") for n in range(200)]
+        )
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert upload_cache.stats["misses"] == 8 * 200
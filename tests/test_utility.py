@@ -0,0 +1,85 @@
+import base64
+
+import numpy as np
+import pandas as pd
+
+import utility
+
+
+def upload(text):
+    return "data:text/csv;base64," + base64.b64encode(text.encode()).decode()
+
+
+def test_tied_column_takes_the_sheet_format():
+    columns = [
+        ["1.234,5", "7.094,25"],
+        # fits `1,234.5` and `1.234,5` alike
+        ["2.000", "-4", "40%"],
+    ]
+
+    assert utility.sniff_number_format(columns[1]) is None
+    assert utility.sniff_sheet_formats(columns) == [1, 1]
+
+
+def test_sheet_without_evidence_defaults_to_first_format():
+    assert utility.sniff_sheet_formats([["2008", "-4"], [None, ""]]) == [0, 0]
+
+
+def test_mixed_evidence_german_file():
+    # 2019 is decided by "1.234,5", the 2020 cells fit either format
+    sheet = (
+        'Year,2019,2020\nGDP,"1.234,5",2.000\nImports,"7.094,25",-4\nInflation,3,40%\n'
+    )
+
+    df = utility.parse_data("german.csv", upload(sheet))
+
+    np.testing.assert_array_equal(df[2019], [1234.5, 7094.25, 3.0])
+    np.testing.assert_array_equal(df[2020], [2000.0, -4.0, 40.0])
+
+
+def test_mixed_evidence_german_columns():
+    # per column (years) sniffing: 2020 only has tied cells
+    raw = pd.DataFrame(
+        [["1.234,5", "2.000"], ["7.094,25", "-4"]],
+        index=["GDP", "Imports"],
+    )
+
+    np.testing.assert_array_equal(
+        utility.parse_numeric_frame(raw), [[1234.5, 2000.0], [7094.25, -4.0]]
+    )
+
+
+def test_english_file_unchanged():
+    sheet = 'Year,2019,2020\nGDP,"3,441",2.000\nImports,2.5,-4\n'
+
+    df = utility.parse_data("english.csv", upload(sheet))
+
+    np.testing.assert_array_equal(df[2019], [3441.0, 2.5])
+    np.testing.assert_array_equal(df[2020], [2.0, -4.0])
+
+
+def test_text_cells_only_keep_their_column_as_text():
+    sheet = 'Year,2019,2020,2021\nGDP,"1,234.5","2,000",31%\nDebt,7,8, -   \n'
+    source = utility.decode_upload(upload(sheet))
+
+    raw = utility.read_csv_numbers(source)
+
+    assert pd.api.types.is_numeric_dtype(raw[1])
+    assert pd.api.types.is_numeric_dtype(raw[2])
+    assert raw[3].dtype == object
+
+    df = utility.parse_data("mixed.csv", upload(sheet))
+
+    np.testing.assert_array_equal(df[2019], [1234.5, 7.0])
+    np.testing.assert_array_equal(df[2021], [31.0, np.nan])
+
+
+def test_summary_table_of_read_only_frame():
+    # like a memory-mapped dataset, years without a previous year column
+    values = np.array([[100.0, 110.0], [40.0, 5.0]])
+    values.setflags(write=False)
+    df = pd.DataFrame(values, index=["GDP", "Imports"], columns=[2020, 2022])
+
+    changes = utility.summary_table(df)[1]
+
+    assert (changes.to_numpy() == 0).all()
@@ -0,0 +1,214 @@
+"""
+upload cache
+
+parsed upload frames and their derived summaries are kept by content hash,
+in a bounded in-memory LRU backed by `.npy` files on disk (see datastore),
+so re-uploading the same sheet, even after a restart, skips parsing.
+"""
+
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import datastore
+from utility import CHUNK_BYTES, file_type, parse_data, summary_table, upload_header
+
+CACHE_DIR = os.path.join(datastore.STORE_DIR, "uploads")
+
+# parsed frames | summaries kept in memory, and on disk
+MAX_ENTRIES = int(os.environ.get("UPLOAD_CACHE_SIZE", 16))
+MAX_DISK_ENTRIES = int(os.environ.get("UPLOAD_CACHE_DISK_SIZE", 64))
+
+# (key, part) -> dataframe, most recently used last
+_entries = OrderedDict()
+_lock = threading.Lock()
+
+stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+
+
+def content_key(filename, contents):
+    """
+    -> content hash of an upload, the base64 payload maps 1:1 to the file bytes
+    :param filename: uploaded file name, its type decides how it is parsed
+    :param contents: dcc.Upload contents
+    :return: str hex digest
+    :raises ValueError: for a file parse_data would not read, see file_type
+    """
+
+    content_type, start = upload_header(contents)
+    fileType = file_type(filename)
+
+    digest = hashlib.blake2b(fileType.encode(), digest_size=20)
+
+    for offset in range(start, len(contents), CHUNK_BYTES):
+        digest.update(contents[offset : offset + CHUNK_BYTES].encode())
+
+    return digest.hexdigest()
+
+
+def merge_key(df, key):
+    """
+    -> key of a dataset an upload was merged into, see utility.merge_frames
+    :param df: pandas dataframe merged into, df.attrs["key"] set by datastore.map_frame
+    :param key: content_key of the upload
+    :return: str hex digest | None if either key is unknown
+    """
+
+    if df.attrs.get("key") is None or key is None:
+        return None
+
+    digest = hashlib.blake2b(f"{df.attrs['key']}+{key}".encode(), digest_size=20)
+
+    return digest.hexdigest()
+
+
+def _remember(key, part, df):
+    with _lock:
+        _entries[(key, part)] = df
+        _entries.move_to_end((key, part))
+
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+
+def _prune_disk():
+    try:
+        files = [
+            os.path.join(CACHE_DIR, name)
+            for name in os.listdir(CACHE_DIR)
+            if name.endswith(".json")
+        ]
+
+    except OSError:
+        return
+
+    files.sort(key=os.path.getmtime)
+
+    for path in files[: max(len(files) - MAX_DISK_ENTRIES, 0)]:
+        for suffix in (".json", ".npy"):
+            try:
+                os.remove(path[: -len(".json")] + suffix)
+
+            except OSError:
+                pass
+
+
+def get(key, part="data"):
+    """
+    -> cached frame for an upload key, from memory then disk
+    :param key: content_key of the upload
+    :param part: `data` for the parsed frame, `summary` for its changes
+    :return: pandas dataframe | None on a miss
+    """
+
+    with _lock:
+        df = _entries.get((key, part))
+
+        if df is not None:
+            stats["hits"] += 1
+            _entries.move_to_end((key, part))
+            return df
+
+    path = os.path.join(CACHE_DIR, f"{key}-{part}")
+
+    try:
+        df = datastore.map_frame(path)
+        os.utime(f"{path}.json")
+
+    except (OSError, ValueError):
+        with _lock:
+            stats["misses"] += 1
+
+        return None
+
+    with _lock:
+        stats["disk_hits"] += 1
+
+    _remember(key, part, df)
+
+    return df
+
+
+def put(key, df, part="data"):
+    """
+    -> keep a frame for an upload key, in memory and on disk
+    :param key: content_key of the upload
+    :param df: pandas dataframe
+    :param part: `data` for the parsed frame, `summary` for its changes
+    """
+
+    _remember(key, part, df)
+
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        datastore.save_frame(os.path.join(CACHE_DIR, f"{key}-{part}"), df, key)
+        _prune_disk()
+
+    except OSError as e:
+        print(f"[ERROR] Error caching upload `{key}`. {e}")
+
+
+def parse_upload(filename, contents):
+    """
+    -> parse_data for an upload, skipped when the same file was parsed before
+    :param filename: uploaded file name
+    :param contents: dcc.Upload contents
+    :return: (key, pandas dataframe | None)
+    """
+
+    try:
+        key = content_key(filename, contents)
+
+    except ValueError as e:
+        print(f"[ERROR] Error processing file: `{filename}`. {e}")
+        return None, None
+
+    df = get(key)
+    if df is None:
+        df = parse_data(filename, contents)
+
+        if df is not None:
+            put(key, df)
+
+    return key, df
+
+
+def parse_spooled(filename, path, key):
+    """
+    -> parse_upload for an upload decoded to a file, see jobs.submit
+    :param filename: uploaded file name
+    :param path: file holding the decoded upload
+    :param key: content_key of the upload
+    :return: pandas dataframe | None
+    """
+
+    df = get(key)
+    if df is None:
+        with open(path, "rb") as f:
+            df = parse_data(filename, io.BytesIO(f.read()))
+
+        if df is not None:
+            put(key, df)
+
+    return df
+
+
+def summary(df):
+    """
+    -> summary_table of a dataset, cached by the upload it was parsed from
+    :param df: pandas dataframe, df.attrs["key"] set by datastore.map_frame
+    :return: (values, changes) pandas dataframes
+    """
+
+    key = df.attrs.get("key")
+    if key is None:
+        return summary_table(df)
+
+    changes = get(key, part="summary")
+    if changes is None:
+        values, changes = summary_table(df)
+        put(key, changes, part="summary")
+
+    return df, changes
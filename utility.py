@@ -1,108 +1,802 @@
-import base64
-import datetime
+import binascii
+import codecs
+import csv
 import io
+import itertools
+import os
+import re
+import numpy as np
+import openpyxl
 import pandas as pd
-from parse_number import parseNumber
+from chardet.universaldetector import UniversalDetector
+from parse_number import parseNumberArray
+
+# trade stats blocks in file order, used when a block title names neither
+INDUSTRIES = ("Secondary", "Primary")
+BALANCE_NAMES = {"Secondary": "Trade Deficit", "Primary": "Trade Surplus"}
+
+# largest (decoded) upload accepted, in bytes
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", 64 * 1024 * 1024))
+
+# upload bytes handled per step when decoding | sniffing the encoding
+CHUNK_BYTES = 1024 * 1024
+
+# number formats sniffed per column, in tie-break order:
+# (name, thousands, decimal, pattern a cell in that format fully matches,
+#  text -> the same number with no thousands separator and a "." decimal)
+NUMBER_FORMATS = (
+    (
+        "1,234.5",
+        ",",
+        ".",
+        re.compile(r"-?(?:[0-9]{1,3}(?:,[0-9]{3})+|[0-9]+)(?:\.[0-9]+)?|-?\.[0-9]+"),
+        lambda text: text.replace(",", ""),
+    ),
+    (
+        "1.234,5",
+        ".",
+        ",",
+        re.compile(r"-?(?:[0-9]{1,3}(?:\.[0-9]{3})+|[0-9]+)(?:,[0-9]+)?|-?,[0-9]+"),
+        lambda text: text.replace(".", "").replace(",", "."),
+    ),
+    (
+        "1 234,5",
+        " ",
+        ",",
+        re.compile(
+            r"-?(?:[0-9]{1,3}(?:[ \u00a0\u202f][0-9]{3})+|[0-9]+)(?:,[0-9]+)?|-?,[0-9]+"
+        ),
+        lambda text: text.replace(" ", "")
+        .replace("\u00a0", "")
+        .replace("\u202f", "")
+        .replace(",", "."),
+    ),
+)
+
+# text cells of a column looked at to sniff its number format
+SNIFF_CELLS = 20
+
+
+# rows of an excel sheet searched for its `Year` row
+YEAR_SEARCH_ROWS = 100
+
+# empty rows in a row after which an excel sheet is taken to end
+MAX_EMPTY_ROWS = 50
+
 
 # utility functions
-def parse_data(filename, contents="", isFileOnly=None, transpose=False):
+def file_type(filename):
+    """
+    -> how parse_data reads a file, by its name
+    :param filename: uploaded file name
+    :return: `csv` | `xls` (legacy, read by xlrd) | `xlsx`
+    :raises ValueError: for any other file
     """
-    -> parse uploaded .csv | .xlsx data
+
+    if "csv" in filename:
+        return "csv"
+
+    if filename.lower().endswith(".xls"):
+        return "xls"
+
+    if "xls" in filename:
+        return "xlsx"
+
+    raise ValueError("expected a .csv or .xls(x) file")
+
+
+def parse_data(filename, contents="", isFileOnly=None, transpose=False, sheet=None):
+    """
+    -> parse uploaded .csv | .xlsx data into a float64 frame
+    -> rows are indexed by indicator label and columns by (int) year
     -> [isFileOnly] if True will read from file only (default onStart file to load data)
-    :param contents:
+    -> [sheet] excel sheet name | index, default the first one with a `Year` row
+    :param contents: dcc.Upload contents | io.BytesIO of the decoded file
     :param filename:
     :param isFileOnly
-    :return: pandas dataframe
+    :param sheet:
+    :return: pandas dataframe | None if the file could not be processed
     """
 
-    if isFileOnly:
-        try:
-            if "csv" in filename:
-                # Assume that the user uploaded a CSV or TXT file
-                df = pd.read_csv(
-                    filename,
-                    index_col=False,
-                )
+    df = None
 
-            elif "xls" in filename:
-                # Assume that the user uploaded an excel file
-                pd.read_excel(filename)
+    try:
+        encoding = "utf-8"
 
-        except Exception as e:
-            print(f"[ERROR] Error processing file: `{filename}`. {e}")
+        if isFileOnly:
+            source = filename
 
-            # TODO: Add a bootstrap error button or toast
-            # return html.Div(["There was an error processing this file."])
+        elif isinstance(contents, io.BytesIO):
+            # already decoded, see jobs.submit
+            source = contents
 
-    else:
-        content_type, content_string = contents.split(",")
+        else:
+            source = decode_upload(contents)
 
-        decoded = base64.b64decode(content_string)
+        fileType = file_type(filename)
 
-        try:
-            if "csv" in filename:
-                # Assume that the user uploaded a CSV or TXT file
-                df = pd.read_csv(io.StringIO(decoded.decode("utf-8")))
-                df = df.fillna(method="ffill")
+        if fileType == "csv":
+            # Assume that the user uploaded a CSV or TXT file
+            if not isFileOnly:
+                encoding = detect_encoding(source)
+
+            raw = read_csv_numbers(source, encoding)
+
+        elif fileType == "xls":
+            # legacy excel workbook, only xlrd reads it
+            raw = pd.read_excel(source, header=None, index_col=0, sheet_name=sheet or 0)
 
-            elif "xls" in filename:
-                # Assume that the user uploaded an excel file
-                df = pd.read_excel(io.BytesIO(decoded))
-                df = df.fillna(method="ffill")
+        else:
+            # Assume that the user uploaded an excel file
+            raw = read_excel_rows(source, sheet)
 
-        except Exception as e:
-            print(f"[ERROR] Error processing file: `{filename}`. {e}")
+        df = typed_frame(raw)
+
+    except Exception as e:
+        print(f"[ERROR] Error processing file: `{filename}`. {e}")
 
     # TODO: Add a bootstrap error button or toast
     # return html.Div(["There was an error processing this file."])
 
-    # Transpose to make first column into rows
-    # set default file first column as df header for easy referencing
-    if transpose:
-        df2 = df.T
+    if df is not None and transpose:
+        df = df.T
+
+    return df
+
+
+def sample_rows(source, encoding="utf-8", rows=SNIFF_CELLS):
+    """
+    -> first rows of a csv file, read with the csv module
+    :param source: file path | io.BytesIO, left at its start
+    :param encoding: text encoding
+    :return: list of rows, lists of str
+    """
+
+    if hasattr(source, "getbuffer"):
+        view = source.getbuffer()
+        head = view[: 4 * CHUNK_BYTES].tobytes()
+        view.release()
 
     else:
-        df2 = df
+        with open(source, "rb") as sourceFile:
+            head = sourceFile.read(4 * CHUNK_BYTES)
 
-    # header = df2.iloc[0]
-    # df2 = df2[1:]
-    # df2.columns = header
+    lines = head.decode(encoding, errors="replace").splitlines()
 
-    return df2
+    # the last line may be cut in the middle
+    if len(head) == 4 * CHUNK_BYTES:
+        lines = lines[:-1]
 
+    return list(itertools.islice(csv.reader(lines), rows + 1))
 
-def calc_percentage_change(html, latestValue, prevValue):
-    # return a Div component styled for red | green
 
-    perc_change = 0
-    color = "grey"
+def read_csv_numbers(source, encoding="utf-8"):
+    """
+    -> read a csv sheet, with read_csv's C parser converting the columns whose
+       first rows are plain numbers, when the sheet has a single number format
+    -> other columns are kept as text, see parse_numeric_frame
+    :param source: file path | io.BytesIO
+    :param encoding: text encoding
+    :return: pandas dataframe, first column as index, no header, its
+             attrs["numberFormat"] set when the C parser was used
+    """
+
+    options = {"header": None, "index_col": 0, "encoding": encoding}
+
+    columns = list(itertools.zip_longest(*sample_rows(source, encoding)))
+    formats = set(sniff_sheet_formats(columns[1:]))
+
+    if len(formats) == 1:
+        numberFormat = formats.pop()
+        name, thousands, decimal, pattern, normalize = NUMBER_FORMATS[numberFormat]
 
-    perc_ch = (latestValue - prevValue) / prevValue
+        # cells like "31%" | "-" only send their own column back to text
+        text = {
+            n: object
+            for n, column in enumerate(columns)
+            if n == 0 or not all(pattern.fullmatch(cell) for cell in column if cell)
+        }
+
+        if len(text) < len(columns):
+            raw = pd.read_csv(
+                source, thousands=thousands, decimal=decimal, dtype=text, **options
+            )
+            # the text columns left may hold no evidence of it
+            raw.attrs["numberFormat"] = numberFormat
+            return raw
+
+    return pd.read_csv(source, dtype=object, **options)
+
+
+def read_excel_rows(source, sheet=None):
+    """
+    -> stream a .xlsx sheet in read-only mode, reading only the columns of its
+       (first) `Year` row and stopping after the last indicator row, so other
+       sheets and formatting-heavy ranges are never loaded
+    -> later `Year` blocks are read as wide as the first one
+    :param source: file path | io.BytesIO
+    :param sheet: sheet name | index, default the first sheet with a `Year` row
+                  in its first YEAR_SEARCH_ROWS rows
+    :return: pandas dataframe, first column as index, no header
+    """
+
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+
+    try:
+        if sheet is None:
+            worksheets = workbook.worksheets
+
+        elif isinstance(sheet, int):
+            worksheets = [workbook.worksheets[sheet]]
+
+        else:
+            worksheets = [workbook[sheet]]
+
+        for worksheet in worksheets:
+            head = []
+
+            for row in worksheet.iter_rows(max_row=YEAR_SEARCH_ROWS, values_only=True):
+                head.append(row)
+
+                label = row[0] if row else None
+                if isinstance(label, str) and label.strip().lower() == "year":
+                    break
+
+            else:
+                continue
+
+            break
+
+        else:
+            raise ValueError("no `Year` row found")
+
+        width = max(n for n, cell in enumerate(head[-1]) if cell is not None) + 1
+        rows = [row[:width] + (None,) * (width - len(row)) for row in head]
+
+        emptyRows = 0
+        for row in worksheet.iter_rows(
+            min_row=len(head) + 1, max_col=width, values_only=True
+        ):
+            if any(cell is not None for cell in row):
+                emptyRows = 0
+
+            elif emptyRows + 1 == MAX_EMPTY_ROWS:
+                break
+
+            else:
+                emptyRows += 1
+
+            rows.append(row + (None,) * (width - len(row)))
+
+    finally:
+        workbook.close()
+
+    if emptyRows:
+        del rows[-emptyRows:]
+
+    return pd.DataFrame(rows).set_index(0)
+
+
+def upload_header(contents, maxBytes=None):
+    """
+    -> check a dcc.Upload data URI header and its decoded size, without decoding
+    :param contents: dcc.Upload contents, `data:<type>;base64,<payload>`
+    :param maxBytes: largest decoded size accepted, MAX_UPLOAD_BYTES by default
+    :return: (content type, index where the base64 payload starts)
+    """
+
+    comma = contents.find(",", 0, 256)
+    header = contents[:comma] if comma > 0 else ""
+
+    if not (header.startswith("data:") and header.endswith(";base64")):
+        raise ValueError("expected a base64 encoded upload")
+
+    size = (len(contents) - comma - 1) * 3 // 4 - contents[-2:].count("=")
+    maxBytes = MAX_UPLOAD_BYTES if maxBytes is None else maxBytes
+
+    if size > maxBytes:
+        raise ValueError(f"upload is {size} bytes, the limit is {maxBytes} bytes")
+
+    return header[len("data:") : -len(";base64")], comma + 1
+
+
+def decode_upload(contents, maxBytes=None):
+    """
+    -> decode a dcc.Upload payload into a single bytes buffer, chunk by chunk
+    -> no intermediate copies of the whole payload (split | encode | decode)
+    :param contents: dcc.Upload contents
+    :param maxBytes: largest decoded size accepted, MAX_UPLOAD_BYTES by default
+    :return: io.BytesIO
+    """
+
+    content_type, start = upload_header(contents, maxBytes)
+
+    # a multiple of 4 base64 characters decodes on its own
+    step = CHUNK_BYTES // 3 * 4
+    buffer = io.BytesIO()
+
+    for offset in range(start, len(contents), step):
+        buffer.write(binascii.a2b_base64(contents[offset : offset + step]))
+
+    buffer.seek(0)
+    return buffer
+
+
+def detect_encoding(buffer):
+    """
+    -> text encoding of an uploaded file: byte order mark, else utf-8 if the
+       bytes decode as utf-8 (checked chunk by chunk), else chardet's guess
+    :param buffer: io.BytesIO from decode_upload
+    :return: str encoding name
+    """
+
+    view = buffer.getbuffer()
+
+    try:
+        for bom, encoding in (
+            (codecs.BOM_UTF8, "utf-8-sig"),
+            (codecs.BOM_UTF16_LE, "utf-16"),
+            (codecs.BOM_UTF16_BE, "utf-16"),
+        ):
+            if view[: len(bom)] == bom:
+                return encoding
+
+        decoder = codecs.getincrementaldecoder("utf-8")()
+
+        try:
+            for offset in range(0, len(view), CHUNK_BYTES):
+                decoder.decode(view[offset : offset + CHUNK_BYTES])
+
+            decoder.decode(b"", final=True)
+            return "utf-8"
+
+        except UnicodeDecodeError:
+            pass
+
+        # chardet is slow, a few MB are plenty to guess from
+        detector = UniversalDetector()
+
+        for offset in range(0, min(len(view), 4 * CHUNK_BYTES), CHUNK_BYTES):
+            detector.feed(view[offset : offset + CHUNK_BYTES].tobytes())
+
+            if detector.done:
+                break
+
+        detector.close()
+
+        # latin-1 decodes any byte, keep it as the last resort
+        return detector.result["encoding"] or "latin-1"
+
+    finally:
+        view.release()
+
+
+def sniff_number_format(cells):
+    """
+    -> number format of a column, from its first text cells
+    -> a cell only one format fits decides, else the format most cells fit
+    -> None on a tie (e.g "2.000" | "-4" fit both `1,234.5` and `1.234,5`),
+       see sniff_sheet_formats
+    :param cells: iterable of raw cells
+    :return: int index in NUMBER_FORMATS | None
+    """
+
+    counts = [0] * len(NUMBER_FORMATS)
+    seen = 0
+
+    for cell in cells:
+        if type(cell) is not str:
+            continue
+
+        text = cell.strip().rstrip("%").rstrip()
+        if not text:
+            continue
+
+        fits = [
+            n
+            for n, (name, thousands, decimal, pattern, normalize) in enumerate(
+                NUMBER_FORMATS
+            )
+            if pattern.fullmatch(text)
+        ]
+
+        if len(fits) == 1:
+            return fits[0]
+
+        for n in fits:
+            counts[n] += 1
+
+        seen += 1
+        if seen == SNIFF_CELLS:
+            break
+
+    best = max(counts)
+    if not best or counts.count(best) > 1:
+        return None
+
+    return counts.index(best)
+
+
+def sniff_sheet_formats(columns, sheetFormat=None):
+    """
+    -> number format of every column of a sheet, columns sniff_number_format
+       can't decide take the format decided for most other columns
+       (`1,234.5` if none is decided), a sheet is written in one locale
+    :param columns: iterable of columns, iterables of raw cells
+    :param sheetFormat: format undecided columns take instead, when it was
+                        sniffed from columns not given here
+    :return: list of int index in NUMBER_FORMATS
+    """
+
+    formats = [sniff_number_format(cells) for cells in columns]
+    decided = [numberFormat for numberFormat in formats if numberFormat is not None]
+
+    if sheetFormat is None:
+        # NUMBER_FORMATS order breaks ties between columns too
+        sheetFormat = max(sorted(set(decided)), key=decided.count) if decided else 0
+
+    return [
+        sheetFormat if numberFormat is None else numberFormat
+        for numberFormat in formats
+    ]
+
+
+def parse_numbers(cells, numberFormat=0):
+    """
+    -> convert raw cells in one known number format to float64, all at once
+    -> cells the format doesn't fit (e.g "$ 7,094", "n/a") fall back to
+       parseNumberArray, a trailing `%` is dropped
+    :param cells: 1d numpy object array of str | float cells
+    :param numberFormat: index in NUMBER_FORMATS, see sniff_number_format
+    :return: float64 numpy array
+    """
 
-    signedPercChange = perc_ch * 100
+    normalize = NUMBER_FORMATS[numberFormat][-1]
+    numbers = [
+        normalize(cell.strip().rstrip("%")) if type(cell) is str else cell
+        for cell in cells
+    ]
 
-    if signedPercChange < 0:
+    try:
+        values = np.array(numbers, dtype="float64")
+
+    except (TypeError, ValueError):
+        values = pd.to_numeric(
+            pd.Series(numbers, dtype=object), errors="coerce"
+        ).to_numpy(dtype="float64", copy=True)
+
+    # empty cells are NaN too, only text goes to the heuristic parser
+    missing = np.flatnonzero(np.isnan(values))
+    unparsed = [
+        row for row in missing if type(cells[row]) is str and cells[row].strip()
+    ]
+
+    if unparsed:
+        text = pd.Series([cells[row].strip() for row in unparsed], dtype=object)
+        values[unparsed] = parseNumberArray(text)
+
+    return values
+
+
+def parse_numeric_frame(raw):
+    """
+    -> float64 values of a raw sheet, each column parsed in its sniffed number
+       format, columns sharing a format converted together
+    :param raw: pandas dataframe as read with header=None, index_col=0
+    :return: 2d float64 numpy array
+    """
+
+    isNumeric = [pd.api.types.is_numeric_dtype(dtype) for dtype in raw.dtypes]
+    if all(isNumeric):
+        return raw.to_numpy(dtype="float64")
+
+    cells = raw.to_numpy(dtype=object)
+    values = np.empty(raw.shape, dtype="float64")
+
+    # -1 for columns read as numbers already
+    textColumns = [column for column, numeric in enumerate(isNumeric) if not numeric]
+    formats = np.full(len(isNumeric), -1)
+    formats[textColumns] = sniff_sheet_formats(
+        (cells[:, column] for column in textColumns), raw.attrs.get("numberFormat")
+    )
+
+    for numberFormat in np.unique(formats):
+        columns = np.flatnonzero(formats == numberFormat)
+
+        if numberFormat == -1:
+            values[:, columns] = raw.iloc[:, columns].to_numpy(dtype="float64")
+
+        else:
+            block = cells[:, columns]
+            values[:, columns] = parse_numbers(block.ravel(), numberFormat).reshape(
+                block.shape
+            )
+
+    return values
+
+
+def typed_frame(raw):
+    """
+    -> turn a raw sheet (first column as index, no header) into a float64 frame
+    -> a `Year` row gives the (int) column axis for the rows under it
+    -> sheets with titled or several `Year` blocks (trade stats) get a
+       (block title, indicator) row index, see industry_frame
+    :param raw: pandas dataframe as read with header=None, index_col=0
+    :return: pandas dataframe
+    """
+
+    labels = ["" if pd.isna(label) else str(label).strip() for label in raw.index]
+    values = parse_numeric_frame(raw)
+    emptyRows = np.isnan(values).all(axis=1)
+
+    yearRows = [row for row, label in enumerate(labels) if label.lower() == "year"]
+    if not yearRows:
+        raise ValueError("no `Year` row found")
+
+    titles = []
+    blocks = []
+    for n, yearRow in enumerate(yearRows):
+        # a label with no values right above a `Year` row is the block title
+        if yearRow > 0 and emptyRows[yearRow - 1] and labels[yearRow - 1]:
+            titles.append(labels[yearRow - 1])
+
+        else:
+            titles.append(None)
+
+        end = yearRows[n + 1] if n + 1 < len(yearRows) else len(labels)
+        rows = [row for row in range(yearRow + 1, end) if labels[row]]
+        if (
+            n + 1 < len(yearRows)
+            and rows
+            and rows[-1] == end - 1
+            and emptyRows[end - 1]
+        ):
+            rows = rows[:-1]
+
+        years = values[yearRow]
+        hasYear = ~np.isnan(years)
+        blocks.append(
+            pd.DataFrame(
+                values[rows][:, hasYear],
+                index=pd.Index([labels[row] for row in rows], name="Indicator"),
+                columns=pd.Index(years[hasYear].astype(int), name="Year"),
+            )
+        )
+
+    if titles == [None]:
+        return blocks[0]
+
+    titles = [title or INDUSTRIES[n % 2] for n, title in enumerate(titles)]
+    return pd.concat(blocks, keys=titles, names=["Block", "Indicator"])
+
+
+def industry_frame(df, industry):
+    """
+    -> rows of one industry (`Primary` | `Secondary`) of a trade stats frame
+    :param df: pandas dataframe from parse_data
+    :param industry: one of INDUSTRIES
+    :return: pandas dataframe, indicator rows by year columns
+    """
+
+    if df.index.nlevels == 1:
+        return df
+
+    return df.loc[industry_title(list(df.index.unique(level=0)), industry)]
+
+
+def industry_title(titles, industry):
+    """
+    -> block title of an industry, the one naming it or else by position
+    :param titles: block titles in file order
+    :param industry: one of INDUSTRIES
+    :return: str title
+    """
+
+    for title in titles:
+        if industry.lower() in title.lower():
+            return title
+
+    return titles[INDUSTRIES.index(industry) % len(titles)]
+
+
+def industry_series(df, industry):
+    """
+    -> one industry's btei-graph series, see figure_cache
+    -> the last trace (trade balance) is the one drawn as a line in mixed charts
+    :param df: trade stats pandas dataframe from parse_data
+    :param industry: one of INDUSTRIES
+    :return: dict {"x": years, "traces": [{"name", "y"}, ...]}
+    """
+
+    trade = industry_frame(df, industry)
+    names = ("Imports", "Exports", BALANCE_NAMES[industry])
+
+    return {
+        "x": trade.columns.tolist(),
+        "traces": [
+            {"name": name, "y": trade.iloc[row].tolist()}
+            for row, name in enumerate(names)
+        ],
+    }
+
+
+def summary_table(df):
+    """
+    -> value and percentage change since the previous year, for every indicator and year
+    -> the change is NaN where the previous year's value is zero or missing,
+       a year with no previous year column counts as unchanged
+    :param df: pandas dataframe from parse_data
+    :return: (values, changes) pandas dataframes shaped like df
+    """
+
+    years = df.columns.to_numpy()
+    values = df.to_numpy(dtype="float64")
+
+    # written below, and a mapped | copy-on-write frame hands out read-only arrays
+    prevValues = df.reindex(columns=years - 1).to_numpy(dtype="float64", copy=True)
+    noPrevYear = ~np.isin(years - 1, years)
+    prevValues[:, noPrevYear] = values[:, noPrevYear]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        changes = np.divide(values - prevValues, prevValues) * 100
+
+    changes[~np.isfinite(changes)] = np.nan
+
+    return df, pd.DataFrame(changes, index=df.index, columns=df.columns)
+
+
+def merge_frames(df, update):
+    """
+    -> cells of an appended upload (new years | revised values) merged into a
+       dataset by indicator label and year, cells the upload leaves empty are kept
+    -> trade stats blocks are matched by industry, their titles may differ
+    :param df: pandas dataframe from parse_data, the current dataset
+    :param update: pandas dataframe from parse_data, the appended upload
+    :return: (merged pandas dataframe, changed) with changed = {"years": years
+             holding a changed cell, "blocks": block titles with a changed cell}
+    """
+
+    if df.index.nlevels != update.index.nlevels:
+        raise ValueError("the upload's blocks don't match the dataset's")
+
+    if not (df.index.is_unique and update.index.is_unique):
+        raise ValueError("indicator labels must be unique to merge by label")
+
+    if df.index.nlevels > 1:
+        titles = list(df.index.unique(level=0))
+        rename = {}
+
+        for n, title in enumerate(update.index.unique(level=0)):
+            industry = next(
+                (name for name in INDUSTRIES if name.lower() in title.lower()),
+                INDUSTRIES[n % len(INDUSTRIES)],
+            )
+            rename[title] = industry_title(titles, industry)
+
+        update = update.rename(index=rename, level=0)
+
+    index = df.index.append(update.index[~update.index.isin(df.index)])
+    columns = df.columns.union(update.columns)
+    values = df.reindex(index=index, columns=columns).to_numpy(
+        dtype="float64", copy=True
+    )
+
+    cells = np.ix_(index.get_indexer(update.index), columns.get_indexer(update.columns))
+    current = values[cells]
+    given = update.to_numpy(dtype="float64")
+    hasValue = ~np.isnan(given)
+
+    changed = hasValue & (current != given)
+    current[hasValue] = given[hasValue]
+    values[cells] = current
+
+    newYears = ~update.columns.isin(df.columns)
+    years = update.columns[changed.any(axis=0) | newYears]
+
+    if df.index.nlevels == 1:
+        blocks = []
+
+    elif newYears.any():
+        blocks = list(index.unique(level=0))
+
+    else:
+        blocks = list(update.index[changed.any(axis=1)].unique(level=0))
+
+    merged = pd.DataFrame(values, index=index, columns=columns)
+    return merged, {"years": [int(year) for year in years], "blocks": blocks}
+
+
+def update_summary(df, changes, years):
+    """
+    -> summary_table changes of a merged dataset, from the previous changes with
+       only the given years (and the years after them) and new indicators recomputed
+    :param df: pandas dataframe, see merge_frames
+    :param changes: summary_table changes of the dataset df was merged from
+    :param years: years holding a changed cell
+    :return: (values, changes) pandas dataframes shaped like df
+    """
+
+    newRows = ~df.index.isin(changes.index)
+    changes = changes.reindex(index=df.index, columns=df.columns).to_numpy(
+        dtype="float64", copy=True
+    )
+
+    years = set(years)
+    affected = [year for year in df.columns if year in years or year - 1 in years]
+
+    if affected:
+        # a year's change only needs the year before it
+        needed = [
+            year for year in df.columns if year in affected or year + 1 in affected
+        ]
+        changes[:, df.columns.get_indexer(affected)] = summary_table(df[needed])[1][
+            affected
+        ].to_numpy()
+
+    if newRows.any():
+        changes[newRows] = summary_table(df[newRows])[1].to_numpy()
+
+    return df, pd.DataFrame(changes, index=df.index, columns=df.columns)
+
+
+def percentage_change(html, change):
+    # return a Div component styled for red | green
+
+    if np.isnan(change):
+        return "n/a"
+
+    color = "grey"
+
+    if change < 0:
         color = "red"
 
-    if signedPercChange > 0:
+    if change > 0:
         color = "green"
 
-    perc_change = round(signedPercChange, 2)
+    perc_change = round(change, 2)
 
     res = (html.H5(f"{abs(perc_change)} %", style={"color": color, "size": 25}),)
     return res
 
 
+def summary_value(html, value, isRate=False):
+    # return the card value, rates are shown with a % sign
+
+    if np.isnan(value):
+        return "N/A"
+
+    if value.is_integer():
+        value = int(value)
+
+    if isRate:
+        value = f"{value} %"
+
+    return (html.H1(value, style={"size": 40}),)
+
+
 def parseStrNumToNumeric(listData):
+    # parse the whole column at once, unparsable cells come back as NaN
     parsed = []
-    for strNum in listData:
-        parsed.append(parseNumber(strNum))
+    for number in parseNumberArray(listData):
+        if number.is_integer():
+            parsed.append(int(number))
+
+        else:
+            parsed.append(float(number))
 
     return parsed
 
 
-def parse_summary(html, years_list, selectedYear, df):
-    # constants index where needed data is
+def parse_summary(html, selectedYear, summary):
+    """
+    -> summary card values | percentage changes for the selected year
+    :param html: dash html components module
+    :param selectedYear: year picked in the summary dropdown
+    :param summary: (values, changes) from summary_table
+    :return: tuple of callback outputs
+    """
+
+    # constants index where needed data is, in callback output order
     BUDGET_DEF = 4
     IMPORTS = 13
     EXPORTS = 12
@@ -112,101 +806,32 @@ def parse_summary(html, years_list, selectedYear, df):
     GVT_EXP = 14
     PRIV_INV = 9
 
-    if selectedYear in years_list:
-        try:
-            latestData = parseStrNumToNumeric((df[f"{selectedYear}"]))
-            prevYear = int(selectedYear) - 1
-            
-            try:
-                prevData = parseStrNumToNumeric(list(df[f"{prevYear}"]))
-
-            except Exception as err:
-                print('[-] Error getting prev year data: ', prevYear)
-                prevData = parseStrNumToNumeric(list(df[f"{selectedYear}"]))
-
-            budgetDef = (html.H1(latestData[BUDGET_DEF], style={"size": 40}),)
-            budgChange = calc_percentage_change(
-                html, latestData[BUDGET_DEF], prevData[BUDGET_DEF]
-            )
-
-            imports = (html.H1(latestData[IMPORTS], style={"size": 40}),)
-            importsCh = calc_percentage_change(
-                html, latestData[IMPORTS], prevData[IMPORTS]
-            )
+    SUMMARY_ROWS = (
+        (BUDGET_DEF, False),
+        (IMPORTS, False),
+        (EXPORTS, False),
+        (NET_IMPORTS, False),
+        (INF_RATE, True),
+        (GRO_RATE, True),
+        (GVT_EXP, True),
+        (PRIV_INV, True),
+    )
 
-            exports = (html.H1(latestData[EXPORTS], style={"size": 40}),)
-            exportsCh = calc_percentage_change(
-                html, latestData[EXPORTS], prevData[EXPORTS]
-            )
+    values, changes = summary
 
-            netImports = (html.H1(latestData[NET_IMPORTS], style={"size": 40}),)
-            netImportsCh = calc_percentage_change(
-                html, latestData[NET_IMPORTS], prevData[NET_IMPORTS]
-            )
+    outputs = [f"{selectedYear}"]
 
-            infRate = (html.H1(f"{latestData[INF_RATE]} %", style={"size": 40}),)
-            infRateCh = calc_percentage_change(
-                html, latestData[INF_RATE], prevData[INF_RATE]
-            )
+    try:
+        latestData = values[int(selectedYear)].to_numpy()
+        latestChange = changes[int(selectedYear)].to_numpy()
 
-            groRate = (html.H1(f"{latestData[GRO_RATE]} %", style={"size": 40}),)
-            groRateCh = calc_percentage_change(
-                html, latestData[GRO_RATE], prevData[GRO_RATE]
-            )
+        for row, isRate in SUMMARY_ROWS:
+            outputs.append(summary_value(html, latestData[row], isRate))
+            outputs.append(percentage_change(html, latestChange[row]))
 
-            gvtExp = (html.H1(f"{latestData[GVT_EXP]} %", style={"size": 40}),)
-            gvtExpCh = calc_percentage_change(
-                html, latestData[GVT_EXP], prevData[GVT_EXP]
-            )
+    except Exception as err:
+        outputs = [f"{selectedYear}"] + ["N/A", "n/a"] * len(SUMMARY_ROWS)
 
-            privInv = (html.H1(f"{latestData[PRIV_INV]} %", style={"size": 40}),)
-            privInvCh = calc_percentage_change(
-                html, latestData[PRIV_INV], prevData[PRIV_INV]
-            )
+        print("Error: ", err)
 
-        except Exception as err:
-            budgetDef = "N/A"
-            budgChange = "n/a"
-
-            imports = "N/A"
-            importsCh = "n/a"
-
-            exports = "N/A"
-            exportsCh = "n/a"
-
-            netImports = "N/A"
-            netImportsCh = "n/a"
-
-            infRate = "N/A"
-            infRateCh = "n/a"
-
-            groRate = "N/A"
-            groRateCh = "n/a"
-
-            gvtExp = "N/A"
-            gvtExpCh = "n/a"
-
-            privInv = "N/A"
-            privInvCh = "n/a"
-
-            print("Error: ", err)
-
-    return (
-        f"{selectedYear}",
-        budgetDef,
-        budgChange,
-        imports,
-        importsCh,
-        exports,
-        exportsCh,
-        netImports,
-        netImportsCh,
-        infRate,
-        infRateCh,
-        groRate,
-        groRateCh,
-        gvtExp,
-        gvtExpCh,
-        privInv,
-        privInvCh,
-    )
+    return tuple(outputs)